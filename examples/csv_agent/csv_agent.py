@@ -14,18 +14,41 @@ The agent provides the following capabilities:
 
 import os
 import io
+import ast
+import copy
+import operator
+import functools
+import itertools
+import weakref
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, NamedTuple, Optional, Sequence, Union
 from dataclasses import dataclass
 
 import pandas as pd
 import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:  # pyarrow is optional, pandas I/O is used without it
+    pa = None
 from lihil import Lihil
 from lihil.routing import Route
 from lihil_mcp import MCPConfig, mcp_tool, mcp_resource
 
-# Global store for loaded CSV files
-csv_store: Dict[str, pd.DataFrame] = {}
+class StoredFrame(NamedTuple):
+    """A loaded DataFrame with its version, stored and replaced as one entry."""
+    df: pd.DataFrame
+    version: int
+
+# Global store for loaded CSV files; endpoints read an entry once, so a concurrent
+# load or unload can never pair a frame with another frame's version
+csv_store: Dict[str, StoredFrame] = {}
+# Stored frames by version, for the memoized helpers below. A frame stays here while
+# its entry is stored or a request still holds that entry, even after it was replaced
+_frames: "weakref.WeakValueDictionary[int, pd.DataFrame]" = weakref.WeakValueDictionary()
+_version_counter = itertools.count(1)
 
 @dataclass
 class CSVInfo:
@@ -36,6 +59,313 @@ class CSVInfo:
     dtypes: Dict[str, str]
     memory_usage: str
 
+def _encode_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """Dictionary-encode low-cardinality string columns and back the rest with Arrow.
+
+    Arrow-backed strings keep NaN as their missing value, so they behave like the
+    object columns they replace while `==` and `str.contains` run in Arrow kernels.
+    """
+    n_rows = len(df)
+    if n_rows == 0:
+        return df
+    for col in df.select_dtypes(include="object").columns:
+        n_unique = df[col].nunique(dropna=False)
+        if n_unique / n_rows < 0.5 and n_unique < 2**16:
+            df[col] = df[col].astype("category")
+        elif pa is not None and pd.api.types.infer_dtype(df[col], skipna=True) == "string":
+            df[col] = df[col].astype(pd.StringDtype("pyarrow", na_value=np.nan))
+    return df
+
+def _fill_na_with_value(df: pd.DataFrame, value: str) -> pd.DataFrame:
+    """fillna with a scalar, registering it as a category where needed."""
+    for col in df.select_dtypes(include="category").columns:
+        if value not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories([value])
+    return df.fillna(value)
+
+def _store_frame(filename: str, df: pd.DataFrame) -> StoredFrame:
+    """Store a DataFrame under a new version so cached results are invalidated."""
+    entry = StoredFrame(df, next(_version_counter))
+    _frames[entry.version] = df
+    csv_store[filename] = entry
+    return entry
+
+def _drop_frame(filename: str) -> bool:
+    """Remove a DataFrame from the store, returning whether it was loaded."""
+    return csv_store.pop(filename, None) is not None
+
+@functools.lru_cache(maxsize=1024)
+def _compute_column_stats(filename: str, column: str, version: int) -> Dict[str, Any]:
+    """Distinct, most common and null counts of one column from a single value_counts pass."""
+    counts = _frames[version][column].value_counts(dropna=False)
+    is_null = counts.index.isna()
+    non_null = counts[~is_null]
+    return {
+        "unique_values": int((non_null > 0).sum()),
+        "most_common": non_null[non_null > 0].head(3).to_dict(),
+        "null_count": int(counts[is_null].sum())
+    }
+
+@functools.lru_cache(maxsize=64)
+def _compute_stats(filename: str, version: int) -> Dict[str, Any]:
+    """Statistical summary of a stored DataFrame, memoized per (filename, version)."""
+    df = _frames[version]
+    
+    # Basic info
+    info = {
+        "filename": filename,
+        "shape": df.shape,
+        "columns": list(df.columns),
+        "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()}
+    }
+    
+    # Numeric columns statistics
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    if len(numeric_cols) > 0:
+        info["numeric_statistics"] = df[numeric_cols].describe().to_dict()
+    
+    # String columns info
+    string_cols = df.select_dtypes(include=['object', 'category', 'string']).columns
+    if len(string_cols) > 0:
+        info["string_statistics"] = {
+            col: _compute_column_stats(filename, col, version) for col in string_cols
+        }
+    
+    # Missing values
+    info["missing_values"] = df.isnull().sum().to_dict()
+    
+    return info
+
+@functools.lru_cache(maxsize=64)
+def _memory_usage(filename: str, version: int) -> str:
+    """Deep memory footprint of a stored DataFrame, memoized per (filename, version)."""
+    return f"{_frames[version].memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB"
+
+@functools.lru_cache(maxsize=64)
+def _compute_file_info(filename: str, version: int) -> Dict[str, Any]:
+    """Overview of one stored DataFrame, memoized per (filename, version)."""
+    df = _frames[version]
+    return {
+        "filename": filename,
+        "rows": len(df),
+        "columns": len(df.columns),
+        "column_names": list(df.columns),
+        "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "memory_usage": _memory_usage(filename, version)
+    }
+
+@functools.lru_cache(maxsize=16)
+def _compute_loaded_files(versions: tuple[tuple[str, int], ...]) -> Dict[str, Any]:
+    """Overview of all stored DataFrames, memoized on the store's version snapshot."""
+    files_info = [_compute_file_info(*item) for item in versions]
+    
+    return {
+        "loaded_files": files_info,
+        "total_files": len(versions)
+    }
+
+# pd.read_csv's default NA markers and booleans; Arrow's defaults lack "None" and "<NA>"
+# and would also read 1/0 as booleans
+_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+_TRUE_VALUES = ["True", "TRUE", "true"]
+_FALSE_VALUES = ["False", "FALSE", "false"]
+
+def _read_csv_arrow(filepath: str, delimiter: str, encoding: str) -> Optional[pd.DataFrame]:
+    """Parse a CSV file with Arrow, or return None where pandas would read it differently."""
+    read_options = pacsv.ReadOptions(encoding=encoding, use_threads=True)
+    parse_options = pacsv.ParseOptions(delimiter=delimiter)
+    convert_options = pacsv.ConvertOptions(
+        null_values=_NA_VALUES,
+        true_values=_TRUE_VALUES,
+        false_values=_FALSE_VALUES,
+        strings_can_be_null=True,
+    )
+    table = pacsv.read_csv(filepath, read_options, parse_options, convert_options)
+    
+    # pandas renames duplicate and empty headers (a.1, Unnamed: 0)
+    names = table.column_names
+    if "" in names or len(set(names)) != len(names):
+        return None
+    
+    column_types = {}
+    for field, column in zip(table.schema, table.columns):
+        if pa.types.is_floating(field.type):
+            # Integers beyond int64 become floats in Arrow but stay exact in pandas
+            largest = pc.max(pc.abs(column)).as_py()
+            if largest is not None and largest >= 2**63:
+                return None
+        elif pa.types.is_temporal(field.type):
+            # Arrow normalizes the text of dates and times ("10:30" -> "10:30:00")
+            column_types[field.name] = pa.string()
+        elif pa.types.is_null(field.type) and table.num_rows:
+            # pandas reads an all-empty column as float64 NaN
+            column_types[field.name] = pa.float64()
+    if column_types:
+        convert_options.column_types = column_types
+        table = pacsv.read_csv(filepath, read_options, parse_options, convert_options)
+    
+    # One block per column: no consolidation copy, and single-column
+    # reads never share a buffer with unrelated columns
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    # Arrow leaves None in object columns where pandas has NaN
+    for col in df.select_dtypes(include="object").columns:
+        if df[col].hasnans:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+def _read_csv(filepath: str, delimiter: str, encoding: str) -> pd.DataFrame:
+    """Parse a CSV file with Arrow's multi-threaded reader, falling back to pandas.
+
+    The Arrow result is converted to what pd.read_csv returns: dates and times keep their
+    original text and "None"/"<NA>" count as missing. Files with duplicate or empty headers
+    or integers beyond int64 are read by pandas, which renames such headers and keeps such
+    integers exact.
+    """
+    if pa is not None and len(delimiter) == 1:
+        try:
+            df = _read_csv_arrow(filepath, delimiter, encoding)
+        except pa.ArrowException:
+            df = None
+        if df is not None:
+            return df
+    return pd.read_csv(filepath, delimiter=delimiter, encoding=encoding)
+
+def _write_csv(df: pd.DataFrame, output_path: str, include_index: bool, delimiter: str) -> None:
+    """Write a DataFrame as CSV with Arrow's C++ writer, falling back to pandas.
+
+    Arrow's output is not byte-identical to DataFrame.to_csv: headers and every string
+    cell are quoted, booleans are written as true/false and integral floats drop their
+    trailing .0, so a float column holding only whole numbers reloads as int64. Arrow
+    would also write the index as a trailing __index_level_0__ column, so include_index
+    always goes through pandas.
+    """
+    if pa is not None and len(delimiter) == 1 and not include_index:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            pacsv.write_csv(
+                table,
+                output_path,
+                write_options=pacsv.WriteOptions(delimiter=delimiter, quoting_style="needed"),
+            )
+            return
+        except pa.ArrowException:
+            pass
+    df.to_csv(output_path, index=include_index, sep=delimiter)
+
+@functools.lru_cache(maxsize=64)
+def _column_names(filename: str, version: int) -> tuple[str, ...]:
+    """Column labels of a stored DataFrame, memoized per (filename, version)."""
+    return tuple(_frames[version].columns.tolist())
+
+def _df_to_payload(df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Encode a DataFrame column-wise instead of building one dict per row."""
+    columns = df.columns.tolist() if columns is None else list(columns)
+    return {"columns": columns, "data": [values.tolist() for _, values in df.items()]}
+
+def _equals_mask(series: pd.Series, value: str) -> np.ndarray:
+    """Compare a column against a query value cast once to the column dtype."""
+    if series.dtype.kind in "iuf":
+        col_arr = series.to_numpy()
+        try:
+            target = col_arr.dtype.type(value)
+        except (TypeError, ValueError, OverflowError):
+            return np.zeros(len(col_arr), dtype=bool)
+        return col_arr == target
+    return (series == value).to_numpy(dtype=bool)
+
+@functools.lru_cache(maxsize=32)
+def _contains_mask(filename: str, column: str, version: int, value: str) -> np.ndarray:
+    """Literal substring matches of a column, memoized per (filename, column, version, value)."""
+    series = _frames[version][column]
+    if not pd.api.types.is_string_dtype(series):
+        series = series.astype(str)
+    mask = series.str.contains(value, na=False, regex=False).to_numpy(dtype=bool)
+    mask.flags.writeable = False
+    return mask
+
+_EXPR_BINOPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+}
+_EXPR_CMPOPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+_EXPR_UNARYOPS = {
+    ast.Not: operator.invert,
+    ast.Invert: operator.invert,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+def _is_numeric(operand: Any) -> bool:
+    """Whether an evaluated expression operand is a number or a numeric column."""
+    if isinstance(operand, pd.Series):
+        return pd.api.types.is_numeric_dtype(operand) and not pd.api.types.is_bool_dtype(operand)
+    return type(operand) in (int, float)
+
+def _eval_node(node: ast.AST, df: pd.DataFrame) -> Any:
+    """Evaluate one node of a parsed filter expression against the columns of df."""
+    if isinstance(node, ast.Name):
+        if node.id not in df.columns:
+            raise ValueError(f"Unknown column: {node.id}")
+        return df[node.id]
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float, str, bool):
+        return node.value
+    if isinstance(node, ast.BoolOp):
+        combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+        return functools.reduce(combine, (_eval_node(value, df) for value in node.values))
+    if isinstance(node, ast.Compare) and type(node.ops[0]) in _EXPR_CMPOPS:
+        result = None
+        left = _eval_node(node.left, df)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _EXPR_CMPOPS:
+                break
+            right = _eval_node(comparator, df)
+            step = _EXPR_CMPOPS[type(op)](left, right)
+            result = step if result is None else result & step
+            left = right
+        else:
+            return result
+    if isinstance(node, ast.BinOp) and type(node.op) in _EXPR_BINOPS:
+        left, right = _eval_node(node.left, df), _eval_node(node.right, df)
+        # Arithmetic only on numbers: `name * 10**9` would otherwise repeat strings
+        if not isinstance(node.op, (ast.BitAnd, ast.BitOr)) and not (_is_numeric(left) and _is_numeric(right)):
+            raise ValueError("Arithmetic is only supported on numeric columns and literals")
+        return _EXPR_BINOPS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _EXPR_UNARYOPS:
+        return _EXPR_UNARYOPS[type(node.op)](_eval_node(node.operand, df))
+    raise ValueError(f"Unsupported syntax in expression: {type(node).__name__}")
+
+def _expr_mask(df: pd.DataFrame, expr: str) -> np.ndarray:
+    """Boolean row mask of a filter expression such as `age > 30 and salary >= 70000`.
+
+    Caller text is never handed to eval or DataFrame.eval: it is parsed with ast and only
+    column names, literals, comparisons and arithmetic/boolean operators are evaluated,
+    so attribute access, calls and `@` local references are all rejected.
+    """
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}") from None
+    result = _eval_node(tree.body, df)
+    if not isinstance(result, pd.Series) or not pd.api.types.is_bool_dtype(result):
+        raise ValueError("Expression must be a boolean condition over columns")
+    return result.to_numpy(dtype=bool, na_value=False)
+
 def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
     """Create the CSV Agent Lihil application with MCP integration."""
     
@@ -54,9 +384,9 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
             if not os.path.exists(filepath):
                 return {"error": f"File not found: {filepath}"}
             
-            df = pd.read_csv(filepath, delimiter=delimiter, encoding=encoding)
+            df = _encode_strings(_read_csv(filepath, delimiter, encoding))
             filename = Path(filepath).name
-            csv_store[filename] = df
+            entry = _store_frame(filename, df)
             
             return {
                 "message": f"Successfully loaded {filename}",
@@ -64,7 +394,7 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
                 "shape": df.shape,
                 "columns": list(df.columns),
                 "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
-                "memory_usage": f"{df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB"
+                "memory_usage": _memory_usage(filename, entry.version)
             }
         except Exception as e:
             return {"error": f"Failed to load CSV: {str(e)}"}
@@ -73,28 +403,17 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
     @mcp_resource(uri_template="lihil://csv/loaded_files", description="Get list of loaded CSV files")
     def list_loaded_files() -> Dict[str, Any]:
         """Get information about all loaded CSV files."""
-        files_info = []
-        for filename, df in csv_store.items():
-            files_info.append({
-                "filename": filename,
-                "rows": len(df),
-                "columns": len(df.columns),
-                "column_names": list(df.columns),
-                "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
-                "memory_usage": f"{df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB"
-            })
-        
-        return {
-            "loaded_files": files_info,
-            "total_files": len(csv_store)
-        }
+        # The snapshot keeps every listed frame alive until the overview is built
+        snapshot = tuple(csv_store.items())
+        overview = _compute_loaded_files(tuple((name, entry.version) for name, entry in snapshot))
+        # The memoized overview is shared by every later request; hand out a copy
+        return copy.deepcopy(overview)
     
     @csv_route.delete
     @mcp_tool(description="Remove a loaded CSV file from memory")
     def unload_csv(filename: str) -> Dict[str, Any]:
         """Remove a CSV file from memory."""
-        if filename in csv_store:
-            del csv_store[filename]
+        if _drop_frame(filename):
             return {"message": f"Successfully unloaded {filename}"}
         return {"error": f"File {filename} not found in memory"}
     
@@ -104,15 +423,16 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
     @mcp_tool(description="Get sample rows from a loaded CSV file")
     def get_sample_data(filename: str, n_rows: int = 5, start_row: int = 0) -> Dict[str, Any]:
         """Get sample rows from a loaded CSV file."""
-        if filename not in csv_store:
+        entry = csv_store.get(filename)
+        if entry is None:
             return {"error": f"File {filename} not loaded"}
         
-        df = csv_store[filename]
+        df = entry.df
         sample_df = df.iloc[start_row:start_row + n_rows]
         
         return {
             "filename": filename,
-            "sample_data": sample_df.to_dict(orient="records"),
+            "sample_data": _df_to_payload(sample_df, _column_names(filename, entry.version)),
             "start_row": start_row,
             "rows_returned": len(sample_df),
             "total_rows": len(df)
@@ -125,37 +445,57 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
         column: Optional[str] = None,
         value: Optional[str] = None,
         condition: str = "equals",
-        limit: int = 100
+        limit: int = 100,
+        expr: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Query CSV data with filters."""
-        if filename not in csv_store:
+        """Query CSV data with filters, or with a boolean expression over columns."""
+        entry = csv_store.get(filename)
+        if entry is None:
             return {"error": f"File {filename} not loaded"}
         
-        df = csv_store[filename]
+        df = entry.df
         
-        if column and value:
+        if expr:
+            try:
+                mask = _expr_mask(df, expr)
+                idx = np.flatnonzero(mask)
+                result_df = df.iloc[idx[:limit]]
+                
+                return {
+                    "filename": filename,
+                    "query": expr,
+                    "results": _df_to_payload(result_df),
+                    "total_matches": int(idx.size),
+                    "returned_rows": len(result_df)
+                }
+            except Exception as e:
+                return {"error": f"Query failed: {str(e)}"}
+        elif column and value:
             if column not in df.columns:
                 return {"error": f"Column {column} not found"}
             
             try:
+                series = df[column]
                 if condition == "equals":
-                    filtered_df = df[df[column] == value]
+                    mask = _equals_mask(series, value)
                 elif condition == "contains":
-                    filtered_df = df[df[column].astype(str).str.contains(value, na=False)]
+                    mask = _contains_mask(filename, column, entry.version, value)
                 elif condition == "greater_than":
-                    filtered_df = df[df[column] > pd.to_numeric(value)]
+                    mask = series.to_numpy() > float(value)
                 elif condition == "less_than":
-                    filtered_df = df[df[column] < pd.to_numeric(value)]
+                    mask = series.to_numpy() < float(value)
                 else:
                     return {"error": f"Unsupported condition: {condition}"}
                 
-                result_df = filtered_df.head(limit)
+                # Only the first `limit` matching rows are materialized
+                idx = np.flatnonzero(mask)
+                result_df = df.iloc[idx[:limit]]
                 
                 return {
                     "filename": filename,
                     "query": f"{column} {condition} {value}",
-                    "results": result_df.to_dict(orient="records"),
-                    "total_matches": len(filtered_df),
+                    "results": _df_to_payload(result_df),
+                    "total_matches": int(idx.size),
                     "returned_rows": len(result_df)
                 }
             except Exception as e:
@@ -165,7 +505,7 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
             result_df = df.head(limit)
             return {
                 "filename": filename,
-                "results": result_df.to_dict(orient="records"),
+                "results": _df_to_payload(result_df),
                 "total_rows": len(df),
                 "returned_rows": len(result_df)
             }
@@ -176,40 +516,12 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
     @mcp_tool(description="Get statistical summary of CSV data")
     def get_statistics(filename: str) -> Dict[str, Any]:
         """Get statistical summary of a loaded CSV file."""
-        if filename not in csv_store:
+        entry = csv_store.get(filename)
+        if entry is None:
             return {"error": f"File {filename} not loaded"}
         
-        df = csv_store[filename]
-        
-        # Basic info
-        info = {
-            "filename": filename,
-            "shape": df.shape,
-            "columns": list(df.columns),
-            "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()}
-        }
-        
-        # Numeric columns statistics
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        if len(numeric_cols) > 0:
-            info["numeric_statistics"] = df[numeric_cols].describe().to_dict()
-        
-        # String columns info
-        string_cols = df.select_dtypes(include=['object']).columns
-        if len(string_cols) > 0:
-            string_info = {}
-            for col in string_cols:
-                string_info[col] = {
-                    "unique_values": df[col].nunique(),
-                    "most_common": df[col].value_counts().head(3).to_dict(),
-                    "null_count": df[col].isnull().sum()
-                }
-            info["string_statistics"] = string_info
-        
-        # Missing values
-        info["missing_values"] = df.isnull().sum().to_dict()
-        
-        return info
+        # The memoized summary is shared by every later request; hand out a copy
+        return copy.deepcopy(_compute_stats(filename, entry.version))
     
     @analysis_route.post
     @mcp_tool(description="Clean CSV data by handling missing values and duplicates")
@@ -220,10 +532,13 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
         fill_na_value: Optional[str] = None
     ) -> Dict[str, Any]:
         """Clean CSV data by handling missing values and duplicates."""
-        if filename not in csv_store:
+        entry = csv_store.get(filename)
+        if entry is None:
             return {"error": f"File {filename} not loaded"}
         
-        df = csv_store[filename].copy()
+        # Shallow copy: the operations below return new frames, and column
+        # replacement on the copy never writes into the stored frame's data
+        df = entry.df.copy(deep=False)
         operations = []
         
         # Handle duplicates
@@ -233,26 +548,34 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
             duplicates_removed = initial_rows - len(df)
             operations.append(f"Removed {duplicates_removed} duplicate rows")
         
-        # Handle missing values
+        # Handle missing values; the count is reused for the response when known
+        missing: Optional[int] = None
         if fill_na_method != "none":
-            na_count = df.isnull().sum().sum()
-            if na_count > 0:
+            missing = int(df.isnull().to_numpy().sum())
+            if missing > 0:
                 if fill_na_method == "drop":
                     df = df.dropna()
-                    operations.append(f"Dropped rows with missing values")
+                    missing = 0
+                    operations.append("Dropped rows with missing values")
                 elif fill_na_method == "fill_value" and fill_na_value:
-                    df = df.fillna(fill_na_value)
+                    df = _fill_na_with_value(df, fill_na_value)
+                    missing = 0
                     operations.append(f"Filled missing values with '{fill_na_value}'")
                 elif fill_na_method == "forward_fill":
                     df = df.ffill()
+                    missing = None
                     operations.append("Forward filled missing values")
                 elif fill_na_method == "backward_fill":
                     df = df.bfill()
+                    missing = None
                     operations.append("Backward filled missing values")
+        if missing is None:
+            missing = int(df.isnull().to_numpy().sum())
         
         # Save cleaned data
+        df = _encode_strings(df)
         cleaned_filename = f"{filename}_cleaned"
-        csv_store[cleaned_filename] = df
+        _store_frame(cleaned_filename, df)
         
         return {
             "message": f"Data cleaned and saved as {cleaned_filename}",
@@ -260,7 +583,7 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
             "cleaned_filename": cleaned_filename,
             "operations": operations,
             "new_shape": df.shape,
-            "remaining_missing_values": df.isnull().sum().sum()
+            "remaining_missing_values": missing
         }
     
     @analysis_route.put
@@ -272,12 +595,13 @@ def create_csv_agent_app() -> tuple[Lihil, MCPConfig]:
         delimiter: str = ","
     ) -> Dict[str, Any]:
         """Export a loaded CSV file to a new location."""
-        if filename not in csv_store:
+        entry = csv_store.get(filename)
+        if entry is None:
             return {"error": f"File {filename} not loaded"}
         
         try:
-            df = csv_store[filename]
-            df.to_csv(output_path, index=include_index, sep=delimiter)
+            df = entry.df
+            _write_csv(df, output_path, include_index, delimiter)
             
             return {
                 "message": f"Successfully exported {filename} to {output_path}",
@@ -15,6 +15,7 @@ class MCPConfig(Struct):
         auth_required: Whether authentication is required for MCP operations
         transport: Transport protocol to use ('asgi' or 'stdio')
         mcp_path_prefix: URL path prefix for MCP endpoints (default: '/mcp')
+        max_concurrency: Maximum number of endpoint calls running at once
     """
 
     enabled: bool = False
@@ -24,3 +25,4 @@ class MCPConfig(Struct):
     auth_required: bool = False
     transport: Literal["asgi", "stdio"] = "asgi"
     mcp_path_prefix: str = "/mcp"
+    max_concurrency: int = 64
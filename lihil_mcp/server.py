@@ -1,17 +1,22 @@
 """Main MCP server implementation for lihil."""
 
 import inspect
-import json
-from typing import Dict, List, Optional, Union, cast
+from copy import deepcopy
+from functools import lru_cache, partial
+from types import FunctionType, MappingProxyType, NoneType, UnionType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union, cast, get_args, get_origin
 
+import msgspec
+from anyio import CapacityLimiter, to_thread
 from lihil import Lihil
-from lihil.interface import IReceive, IScope, ISend
+from lihil.interface import ASGIApp, IReceive, IScope, ISend
 from lihil.routing import Endpoint, Route
 from mcp.server.fastmcp import FastMCP
 
 from .config import MCPConfig
 from .decorators import get_mcp_metadata
 from .types import (
+    EndpointCallPlan,
     MCPError,
     MCPMetadata,
     MCPRegistrationError,
@@ -20,6 +25,161 @@ from .types import (
 )
 
 
+_KEYWORD_KINDS = frozenset(
+    {inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY}
+)
+
+# Schema leaves are shared module constants; generated schemas must not be mutated
+_STRING_SCHEMA: Dict[str, Any] = {"type": "string"}
+_ARRAY_SCHEMA: Dict[str, Any] = {"type": "array"}
+
+_TYPE_MAP: Dict[Any, Dict[str, Any]] = {
+    str: _STRING_SCHEMA,
+    int: {"type": "integer"},
+    float: {"type": "number"},
+    bool: {"type": "boolean"},
+    list: _ARRAY_SCHEMA,
+    dict: {"type": "object"},
+}
+
+
+def _type_schema(annotation: Any) -> Dict[str, Any]:
+    """Map a parameter annotation to its JSON schema, unwrapping Optional and generics."""
+    origin = get_origin(annotation)
+    if origin is Union or origin is UnionType:
+        args = [arg for arg in get_args(annotation) if arg is not NoneType]
+        if len(args) == 1:
+            return _type_schema(args[0])
+        return _STRING_SCHEMA
+
+    if origin is list:
+        args = get_args(annotation)
+        return {"type": "array", "items": _type_schema(args[0])} if args else _ARRAY_SCHEMA
+
+    return _TYPE_MAP.get(origin or annotation, _STRING_SCHEMA)
+
+
+@lru_cache(maxsize=1024)
+def _cached_signature(func: Any) -> inspect.Signature:
+    """inspect.signature, computed once per function object."""
+    return inspect.signature(func)
+
+
+_ParamShape = Tuple[Tuple[str, Any, bool], ...]
+
+_CO_VARARGS_OR_VARKEYWORDS = inspect.CO_VARARGS | inspect.CO_VARKEYWORDS
+
+
+def _param_shape(func: Any) -> _ParamShape:
+    """(name, annotation, required) for each parameter of a function.
+
+    Plain functions are read straight from ``__code__``; anything else (wrapped
+    callables, ``*args``/``**kwargs``, builtins) goes through ``inspect.signature``.
+    """
+    code = getattr(func, "__code__", None)
+    if (
+        type(func) is FunctionType
+        and not code.co_flags & _CO_VARARGS_OR_VARKEYWORDS
+        and not hasattr(func, "__wrapped__")
+        and not hasattr(func, "__signature__")
+    ):
+        n_positional = code.co_argcount
+        names = code.co_varnames[: n_positional + code.co_kwonlyargcount]
+        annotations = func.__annotations__
+        first_default = n_positional - len(func.__defaults__ or ())
+        kwdefaults = func.__kwdefaults__ or {}
+        return tuple(
+            (
+                name,
+                annotations.get(name, inspect.Parameter.empty),
+                index < first_default if index < n_positional else name not in kwdefaults,
+            )
+            for index, name in enumerate(names)
+        )
+
+    return tuple(
+        (name, param.annotation, param.default is inspect.Parameter.empty)
+        for name, param in _cached_signature(func).parameters.items()
+    )
+
+
+def _resolve_forward_refs(func: Any, params: _ParamShape) -> _ParamShape:
+    """Evaluate string annotations (forward references, PEP 563) in the function's globals.
+
+    Like ``typing.get_type_hints``, but one unresolvable name doesn't stop the
+    others from resolving; it keeps its string annotation.
+    """
+    globalns = getattr(func, "__globals__", {})
+
+    def resolve(annotation: Any) -> Any:
+        if type(annotation) is not str:
+            return annotation
+        try:
+            return eval(annotation, globalns)
+        except Exception:
+            return annotation
+
+    return tuple((name, resolve(annotation), required) for name, annotation, required in params)
+
+
+def _build_schema(params: _ParamShape) -> Optional[Dict[str, Union[str, Dict, List]]]:
+    """Build an input schema from (name, annotation, required) triples."""
+    properties = {}
+    required = []
+
+    for param_name, param_type, is_required in params:
+        if param_type == inspect.Parameter.empty:
+            param_type = str
+
+        properties[param_name] = _type_schema(param_type)
+
+        if is_required:
+            required.append(param_name)
+
+    return (
+        {"type": "object", "properties": properties, "required": required}
+        if properties
+        else None
+    )
+
+
+_schema_for_params = lru_cache(maxsize=256)(_build_schema)
+
+
+@lru_cache(maxsize=1024)
+def _schema_for(func: Any) -> Optional[Dict[str, Union[str, Dict, List]]]:
+    """Input schema of a function, shared by every function with the same parameters.
+
+    The returned dict may be shared between endpoints and must not be mutated;
+    ``LihilMCP._generate_input_schema`` hands each tool its own copy.
+    """
+    params = tuple(
+        shape for shape in _param_shape(func) if shape[0] not in ("self", "cls")
+    )
+    if any(type(annotation) is str for _, annotation, _ in params):
+        params = _resolve_forward_refs(func, params)
+    try:
+        return _schema_for_params(params)
+    except TypeError:  # unhashable annotation, build without sharing
+        return _build_schema(params)
+
+
+# Route path -> auto-exposed resource slug, e.g. /api/v1/users -> api_v1_users
+_SLUG_TABLE = str.maketrans("/", "_")
+
+
+# Exact types returned as-is; subclasses go through _to_builtins
+_PRIMITIVE_TYPES = frozenset({dict, list, str, int, float, bool, NoneType})
+
+
+def _to_builtins(result: Any) -> Any:
+    """Convert an endpoint result to JSON-compatible builtins in a single pass.
+
+    Objects msgspec doesn't know how to encode fall back to their ``str()``.
+    """
+    return msgspec.to_builtins(result, enc_hook=str)
+
+
 class LihilMCP:
     """MCP server integration for lihil applications."""
 
@@ -30,7 +190,23 @@ class LihilMCP:
         self.mcp_server = FastMCP(config.server_name)
         self._tools: Dict[str, MCPToolInfo] = {}
         self._resources: Dict[str, MCPResourceInfo] = {}
-        self._endpoint_map: Dict[str, Endpoint] = {}
+        self._tools_view = MappingProxyType(self._tools)
+        self._resources_view = MappingProxyType(self._resources)
+        self._endpoint_map: Dict[str, EndpointCallPlan] = {}
+        self._limiter = CapacityLimiter(config.max_concurrency)
+        # ASGI handler per scope type, resolved once instead of per request
+        self._dispatchers: Dict[str, ASGIApp] = {
+            "http": app,
+            "websocket": app,
+            "lifespan": self._lifespan_call,
+        }
+        # Auto-expose registrar per HTTP method, resolved once instead of per endpoint
+        self._auto_registrars = {
+            "POST": self._auto_register_tool,
+            "PUT": self._auto_register_tool,
+            "PATCH": self._auto_register_tool,
+            "GET": self._auto_register_resource,
+        }
         self._mcp_setup_complete = False
 
     def _setup_mcp_endpoints(self) -> None:
@@ -38,7 +214,7 @@ class LihilMCP:
         if self._mcp_setup_complete:
             return
             
-        for route in self.app.routes:
+        for route in getattr(self.app, "routes", ()):
             route_obj = cast(Route, route)
             for _, endpoint in route_obj.endpoints.items():
                 try:
@@ -78,7 +254,7 @@ class LihilMCP:
         )
 
         self._tools[func_name] = tool_info
-        self._endpoint_map[func_name] = endpoint
+        self._bind_endpoint(func_name, endpoint)
 
         # Register with FastMCP
         @self.mcp_server.tool(name=func_name, description=tool_info.description)
@@ -104,7 +280,7 @@ class LihilMCP:
         )
 
         self._resources[resource_info.uri] = resource_info
-        self._endpoint_map[resource_info.uri] = endpoint
+        self._bind_endpoint(resource_info.uri, endpoint)
 
         # Register with FastMCP
         @self.mcp_server.resource(uri=resource_info.uri)
@@ -114,80 +290,68 @@ class LihilMCP:
 
     def _auto_register_endpoint(self, route: Route, endpoint: Endpoint) -> None:
         """Automatically register an endpoint based on HTTP method."""
+        register = self._auto_registrars.get(endpoint.method.upper())
+        if register is not None:
+            register(route, endpoint)
+
+    def _auto_register_tool(self, route: Route, endpoint: Endpoint) -> None:
+        """Auto-expose a mutating (POST/PUT/PATCH) endpoint as an MCP tool."""
         func = endpoint.unwrapped_func
         func_name = func.__name__
-        method = endpoint.method
-
-        if method.upper() in ["POST", "PUT", "PATCH"]:
-            # Register as tool
-            tool_info = MCPToolInfo(
-                name=func_name,
-                description=func.__doc__ or f"Auto-exposed tool: {func_name}",
-                inputSchema=self._generate_input_schema(func),
-            )
-            self._tools[func_name] = tool_info
-            self._endpoint_map[func_name] = endpoint
-
-            @self.mcp_server.tool(name=func_name, description=tool_info.description)
-            async def mcp_auto_tool_wrapper(**kwargs):
-                return await self._call_endpoint(func_name, kwargs)
-
-        elif method.upper() == "GET":
-            # Register as resource
-            resource_uri = f"lihil://{route.path.replace('/', '_').strip('_')}"
-            resource_info = MCPResourceInfo(
-                uri=resource_uri,
-                name=func_name,
-                description=func.__doc__ or f"Auto-exposed resource: {func_name}",
-                mimeType="application/json",
-            )
-            self._resources[resource_uri] = resource_info
-            self._endpoint_map[resource_uri] = endpoint
 
-            @self.mcp_server.resource(uri=resource_uri)
-            async def mcp_auto_resource_wrapper():
-                return await self._call_endpoint_as_resource(resource_uri)
+        tool_info = MCPToolInfo(
+            name=func_name,
+            description=func.__doc__ or f"Auto-exposed tool: {func_name}",
+            inputSchema=self._generate_input_schema(func),
+        )
+        self._tools[func_name] = tool_info
+        self._bind_endpoint(func_name, endpoint)
+
+        @self.mcp_server.tool(name=func_name, description=tool_info.description)
+        async def mcp_auto_tool_wrapper(**kwargs):
+            return await self._call_endpoint(func_name, kwargs)
+
+    def _auto_register_resource(self, route: Route, endpoint: Endpoint) -> None:
+        """Auto-expose a GET endpoint as an MCP resource."""
+        func = endpoint.unwrapped_func
+        func_name = func.__name__
+
+        resource_uri = f"lihil://{route.path.translate(_SLUG_TABLE).strip('_')}"
+        resource_info = MCPResourceInfo(
+            uri=resource_uri,
+            name=func_name,
+            description=func.__doc__ or f"Auto-exposed resource: {func_name}",
+            mimeType="application/json",
+        )
+        self._resources[resource_uri] = resource_info
+        self._bind_endpoint(resource_uri, endpoint)
+
+        @self.mcp_server.resource(uri=resource_uri)
+        async def mcp_auto_resource_wrapper():
+            return await self._call_endpoint_as_resource(resource_uri)
+
+    def _bind_endpoint(self, key: str, endpoint: Endpoint) -> None:
+        """Map a tool name or resource URI to the call plan of its endpoint."""
+        func = endpoint.unwrapped_func
+        sig = _cached_signature(func)
+        params = sig.parameters.values()
+        self._endpoint_map[key] = EndpointCallPlan(
+            func=func,
+            signature=sig,
+            is_coro=inspect.iscoroutinefunction(func),
+            required_params=frozenset(
+                p.name for p in params if p.default is inspect.Parameter.empty
+            ),
+            param_names=frozenset(sig.parameters),
+            keyword_callable=all(p.kind in _KEYWORD_KINDS for p in params),
+        )
 
     def _generate_input_schema(
         self, func
     ) -> Optional[Dict[str, Union[str, Dict, List]]]:
         """Generate JSON schema for function parameters."""
         try:
-            sig = inspect.signature(func)
-            properties = {}
-            required = []
-
-            for param_name, param in sig.parameters.items():
-                if param_name in ("self", "cls"):
-                    continue
-
-                param_type = param.annotation
-                if param_type == inspect.Parameter.empty:
-                    param_type = str
-
-                # Basic type mapping - this should be enhanced
-                type_map = {
-                    str: {"type": "string"},
-                    int: {"type": "integer"},
-                    float: {"type": "number"},
-                    bool: {"type": "boolean"},
-                    list: {"type": "array"},
-                    dict: {"type": "object"},
-                }
-
-                properties[param_name] = type_map.get(param_type, {"type": "string"})
-
-                if param.default == inspect.Parameter.empty:
-                    required.append(param_name)
-
-            schema = (
-                {"type": "object", "properties": properties, "required": required}
-                if properties
-                else None
-            )
-
-            return schema
-
+            return deepcopy(_schema_for(func))
         except Exception:
             return None
 
@@ -197,29 +361,37 @@ class LihilMCP:
         kwargs: Dict[str, Union[str, int, float, bool, List, Dict]],
     ) -> Union[str, int, float, bool, List, Dict, None]:
         """Call a lihil endpoint from MCP tool."""
-        if tool_name not in self._endpoint_map:
+        plan = self._endpoint_map.get(tool_name)
+        if plan is None:
             raise MCPError(f"Tool {tool_name} not found")
 
-        endpoint = self._endpoint_map[tool_name]
-        func = endpoint.unwrapped_func
+        func = plan.func
 
         try:
-            # Get function signature and validate arguments
-            sig = inspect.signature(func)
-            bound_args = sig.bind(**kwargs)
-            bound_args.apply_defaults()
-
-            # Call the function
-            if inspect.iscoroutinefunction(func):
-                result = await func(**bound_args.arguments)
+            if plan.keyword_callable and plan.required_params <= kwargs.keys() <= plan.param_names:
+                # Arguments already match the signature; Python applies the defaults
+                call_args, call_kwargs = (), kwargs
+            else:
+                # Validate arguments against the signature resolved at registration
+                bound_args = plan.signature.bind(**kwargs)
+                bound_args.apply_defaults()
+                call_args, call_kwargs = bound_args.args, bound_args.kwargs
+
+            # Call the function; sync endpoints run in a worker thread so they
+            # don't block the event loop
+            if plan.is_coro:
+                async with self._limiter:
+                    result = await func(*call_args, **call_kwargs)
             else:
-                result = func(**bound_args.arguments)
+                result = await to_thread.run_sync(
+                    partial(func, *call_args, **call_kwargs), limiter=self._limiter
+                )
 
             # Ensure result is JSON serializable
-            if isinstance(result, (dict, list, str, int, float, bool, type(None))):
+            if type(result) in _PRIMITIVE_TYPES:
                 return result
             else:
-                return json.loads(json.dumps(result, default=str))
+                return _to_builtins(result)
 
         except Exception as e:
             raise MCPError(f"Error calling endpoint {tool_name}: {e}")
@@ -228,37 +400,38 @@ class LihilMCP:
         self, uri: str
     ) -> Union[str, int, float, bool, List, Dict, None]:
         """Call a lihil endpoint from MCP resource."""
-        if uri not in self._endpoint_map:
+        plan = self._endpoint_map.get(uri)
+        if plan is None:
             raise MCPError(f"Resource {uri} not found")
 
-        endpoint = self._endpoint_map[uri]
-        func = endpoint.unwrapped_func
+        func = plan.func
 
         try:
             # Call the function (resources typically don't take parameters)
-            if inspect.iscoroutinefunction(func):
-                result = await func()
+            if plan.is_coro:
+                async with self._limiter:
+                    result = await func()
             else:
-                result = func()
+                result = await to_thread.run_sync(func, limiter=self._limiter)
 
             # Ensure result is JSON serializable
-            if isinstance(result, (dict, list, str, int, float, bool, type(None))):
+            if type(result) in _PRIMITIVE_TYPES:
                 return result
             else:
-                return json.loads(json.dumps(result, default=str))
+                return _to_builtins(result)
 
         except Exception as e:
             raise MCPError(f"Error accessing resource {uri}: {e}")
 
     @property
-    def tools(self) -> Dict[str, MCPToolInfo]:
-        """Get registered MCP tools."""
-        return self._tools.copy()
+    def tools(self) -> Mapping[str, MCPToolInfo]:
+        """Get a read-only view of registered MCP tools."""
+        return self._tools_view
 
     @property
-    def resources(self) -> Dict[str, MCPResourceInfo]:
-        """Get registered MCP resources."""
-        return self._resources.copy()
+    def resources(self) -> Mapping[str, MCPResourceInfo]:
+        """Get a read-only view of registered MCP resources."""
+        return self._resources_view
 
     async def __call__(
         self,
@@ -267,14 +440,17 @@ class LihilMCP:
         send: ISend,
     ) -> None:
         """ASGI application interface with MCP integration."""
-        if scope["type"] == "lifespan":
-            # Let Lihil handle its own lifespan, then setup MCP endpoints
-            await self.app(scope, receive, send)
-            # After Lihil startup is complete, setup MCP endpoints
-            self._setup_mcp_endpoints()
-        else:
-            # Forward all other requests to Lihil
-            await self.app(scope, receive, send)
+        await self._dispatchers.get(scope["type"], self.app)(scope, receive, send)
+
+    async def _lifespan_call(
+        self,
+        scope: IScope,
+        receive: IReceive,
+        send: ISend,
+    ) -> None:
+        """Let Lihil handle its own lifespan, then setup MCP endpoints."""
+        await self.app(scope, receive, send)
+        self._setup_mcp_endpoints()
 
     def get_asgi_app(self) -> "LihilMCP":
         """Get the ASGI application with MCP integration."""
@@ -1,6 +1,7 @@
 """MCP-specific types and data structures."""
 
-from typing import Any, Dict, Optional, Union, Literal
+from inspect import Signature
+from typing import Any, Callable, Dict, FrozenSet, Optional, Union, Literal
 from msgspec import Struct
 
 
@@ -14,7 +15,7 @@ class MCPMetadata(Struct):
     extra: Dict[str, Any] = {}
 
 
-class MCPToolInfo(Struct):
+class MCPToolInfo(Struct, frozen=True):
     """Information about an MCP tool."""
 
     name: str
@@ -22,7 +23,7 @@ class MCPToolInfo(Struct):
     inputSchema: Optional[Dict[str, Any]] = None
 
 
-class MCPResourceInfo(Struct):
+class MCPResourceInfo(Struct, frozen=True):
     """Information about an MCP resource."""
 
     uri: str
@@ -31,6 +32,17 @@ class MCPResourceInfo(Struct):
     mimeType: Optional[str] = None
 
 
+class EndpointCallPlan(Struct, frozen=True):
+    """Invocation data for an endpoint, resolved once at registration."""
+
+    func: Callable[..., Any]
+    signature: Signature
+    is_coro: bool
+    required_params: FrozenSet[str] = frozenset()
+    param_names: FrozenSet[str] = frozenset()
+    keyword_callable: bool = False
+
+
 class MCPError(Exception):
     """Base exception for MCP-related errors."""
     pass
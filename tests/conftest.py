@@ -0,0 +1,16 @@
+import pytest
+from unittest.mock import patch
+
+
+@pytest.fixture(scope="module")
+def _patch_fastmcp():
+    """Patch FastMCP once per requesting module instead of once per test."""
+    with patch('lihil_mcp.server.FastMCP') as mock_fastmcp:
+        yield mock_fastmcp
+
+
+@pytest.fixture
+def mock_fastmcp(_patch_fastmcp):
+    """The module's FastMCP patch, with calls and return value reset for this test."""
+    _patch_fastmcp.reset_mock(return_value=True, side_effect=True)
+    return _patch_fastmcp
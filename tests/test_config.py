@@ -6,6 +6,7 @@ def test_mcp_config_default():
     config = MCPConfig()
     assert config.server_name == "lihil-mcp-server"
     assert config.auto_expose is True
+    assert config.max_concurrency == 64
 
 
 def test_mcp_config_custom():
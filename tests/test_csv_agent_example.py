@@ -75,3 +75,343 @@ def test_csv_agent_run_script_structure():
     assert "uvicorn.run" in content
     print("run_agent.py structure verified successfully!")
 
+
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'examples', 'csv_agent')
+SAMPLE_DATA = os.path.join(EXAMPLE_DIR, 'sample_data')
+
+
+@pytest.fixture
+def csv_agent():
+    """The csv_agent example module, with its global store emptied after each test."""
+    pytest.importorskip("pandas")
+    if EXAMPLE_DIR not in sys.path:
+        sys.path.insert(0, EXAMPLE_DIR)
+    import csv_agent
+    yield csv_agent
+    csv_agent.csv_store.clear()
+
+
+@pytest.fixture
+def endpoints(csv_agent):
+    """The example's endpoint functions by name, callable without HTTP or MCP."""
+    app, _ = csv_agent.create_csv_agent_app()
+    return {
+        endpoint.unwrapped_func.__name__: endpoint.unwrapped_func
+        for route in app.routes
+        for endpoint in route.endpoints.values()
+    }
+
+
+@pytest.fixture
+def employees(endpoints):
+    endpoints["load_csv"](os.path.join(SAMPLE_DATA, "employees.csv"))
+    return "employees.csv"
+
+
+def test_query_data_expr(endpoints, employees):
+    result = endpoints["query_data"](employees, expr="age > 30 and department == 'Engineering'")
+    assert "error" not in result
+    columns = result["results"]["columns"]
+    rows = list(zip(*result["results"]["data"]))
+    assert result["total_matches"] == len(rows) > 0
+    for row in rows:
+        assert row[columns.index("age")] > 30
+        assert row[columns.index("department")] == "Engineering"
+
+
+@pytest.mark.parametrize("expr", [
+    "@os.system('echo PWNED')",
+    "salary.to_csv('/tmp/lihil_mcp_injected.csv') == 1",
+    "__import__('os').system('echo PWNED')",
+    "name.str.len() > 1",
+    "salary > 0 if True else 0",
+    "name * 1000000000 == 'x'",
+    "unknown_column > 1",
+    "age",
+])
+def test_query_data_expr_rejects_unsafe_input(endpoints, employees, expr):
+    result = endpoints["query_data"](employees, expr=expr)
+    assert result["error"].startswith("Query failed")
+    assert not os.path.exists("/tmp/lihil_mcp_injected.csv")
+
+
+def test_load_csv_keeps_int64_so_arithmetic_does_not_overflow(endpoints, employees):
+    loaded = endpoints["get_statistics"](employees)
+    assert loaded["dtypes"]["age"] == "int64"
+
+    everyone = endpoints["query_data"](employees, expr="age > 30")
+    scaled = endpoints["query_data"](employees, expr="age * 10 > 300")
+    assert scaled["total_matches"] == everyone["total_matches"] > 0
+
+
+def test_export_csv_with_index_matches_pandas(csv_agent, endpoints, employees, tmp_path):
+    output = tmp_path / "with_index.csv"
+    result = endpoints["export_csv"](employees, str(output), include_index=True)
+    assert "error" not in result
+
+    expected = tmp_path / "expected.csv"
+    csv_agent.csv_store[employees].df.to_csv(expected, index=True)
+    assert output.read_text() == expected.read_text()
+
+
+def test_export_csv_round_trips_through_load_csv(csv_agent, endpoints, employees, tmp_path):
+    output = tmp_path / "exported.csv"
+    assert "error" not in endpoints["export_csv"](employees, str(output))
+    assert "error" not in endpoints["load_csv"](str(output))
+
+    original = endpoints["get_sample_data"](employees, n_rows=1000)["sample_data"]
+    reloaded = endpoints["get_sample_data"]("exported.csv", n_rows=1000)["sample_data"]
+    assert reloaded == original
+
+
+def test_get_statistics_skips_categories_emptied_by_clean_data(endpoints, tmp_path):
+    rows = [f"a,{i}" for i in range(8)] + ["b,", "c,"]
+    (tmp_path / "letters.csv").write_text("letter,score\n" + "\n".join(rows) + "\n")
+    endpoints["load_csv"](str(tmp_path / "letters.csv"))
+    cleaned = endpoints["clean_data"]("letters.csv", fill_na_method="drop")
+    stats = endpoints["get_statistics"](cleaned["cleaned_filename"])
+
+    assert stats["string_statistics"]["letter"]["most_common"] == {"a": 8}
+    assert stats["string_statistics"]["letter"]["unique_values"] == 1
+
+
+def _column(result, name):
+    """One column of a query result payload, as a list."""
+    payload = result["results"]
+    return payload["data"][payload["columns"].index(name)]
+
+
+@pytest.mark.parametrize("column, value, condition, expected_ids", [
+    ("department", "Engineering", "equals", [1, 3, 6, 10]),
+    ("salary", "65000", "equals", [2]),
+    ("salary", "not a number", "equals", []),
+    ("name", "Johnson", "contains", [3]),
+    ("email", "j", "contains", [1, 2, 3, 9]),
+    ("name", "john|jane", "contains", []),
+    ("salary", "78000", "greater_than", [3, 6]),
+    ("age", "27", "less_than", [3, 10]),
+])
+def test_query_data_conditions(endpoints, employees, column, value, condition, expected_ids):
+    result = endpoints["query_data"](employees, column=column, value=value, condition=condition)
+    assert _column(result, "id") == expected_ids
+    assert result["total_matches"] == result["returned_rows"] == len(expected_ids)
+
+
+def test_query_data_limit_counts_all_matches(endpoints, employees):
+    result = endpoints["query_data"](employees, column="department", value="Engineering", limit=2)
+    assert _column(result, "id") == [1, 3]
+    assert result["total_matches"] == 4
+    assert result["returned_rows"] == 2
+
+
+def test_query_data_without_filter_returns_head(endpoints, employees):
+    result = endpoints["query_data"](employees, limit=3)
+    assert _column(result, "id") == [1, 2, 3]
+    assert result["total_rows"] == 10
+
+
+@pytest.mark.parametrize("kwargs, error", [
+    ({"column": "missing", "value": "x"}, "Column missing not found"),
+    ({"column": "name", "value": "x", "condition": "startswith"}, "Unsupported condition: startswith"),
+])
+def test_query_data_errors(endpoints, employees, kwargs, error):
+    assert endpoints["query_data"](employees, **kwargs) == {"error": error}
+
+
+def test_endpoints_report_files_that_are_not_loaded(endpoints):
+    assert "error" in endpoints["query_data"]("nope.csv")
+    assert "error" in endpoints["get_statistics"]("nope.csv")
+    assert "error" in endpoints["get_sample_data"]("nope.csv")
+    assert "error" in endpoints["clean_data"]("nope.csv")
+    assert "error" in endpoints["unload_csv"]("nope.csv")
+
+
+def test_get_sample_data(endpoints, employees):
+    result = endpoints["get_sample_data"](employees, n_rows=2, start_row=8)
+    payload = result["sample_data"]
+    assert payload["data"][payload["columns"].index("name")] == ["James Miller", "Maria Rodriguez"]
+    assert result["rows_returned"] == 2
+    assert result["total_rows"] == 10
+
+
+def test_get_statistics(endpoints, employees):
+    stats = endpoints["get_statistics"](employees)
+    assert stats["shape"] == (10, 7)
+    assert stats["numeric_statistics"]["salary"]["max"] == 85000
+    assert stats["numeric_statistics"]["age"]["mean"] == pytest.approx(29.6)
+    department = stats["string_statistics"]["department"]
+    assert department == {
+        "unique_values": 4,
+        "most_common": {"Engineering": 4, "Marketing": 2, "HR": 2},
+        "null_count": 0,
+    }
+    assert set(stats["missing_values"].values()) == {0}
+
+
+def test_clean_data_fill_na_methods(endpoints):
+    endpoints["load_csv"](os.path.join(SAMPLE_DATA, "messy_data.csv"))
+    original_missing = sum(endpoints["get_statistics"]("messy_data.csv")["missing_values"].values())
+    assert original_missing > 0
+
+    filled = endpoints["clean_data"]("messy_data.csv", fill_na_method="fill_value", fill_na_value="n/a")
+    assert filled["remaining_missing_values"] == 0
+    sample = endpoints["get_sample_data"]("messy_data.csv_cleaned", n_rows=20)["sample_data"]
+    assert sample["data"][sample["columns"].index("name")][12] == "n/a"
+
+    dropped = endpoints["clean_data"]("messy_data.csv", fill_na_method="drop")
+    assert dropped["remaining_missing_values"] == 0
+    assert dropped["new_shape"] == (9, 6)
+
+    ffilled = endpoints["clean_data"]("messy_data.csv", fill_na_method="forward_fill")
+    assert ffilled["remaining_missing_values"] == 0
+    assert ffilled["operations"] == ["Forward filled missing values"]
+
+    untouched = endpoints["clean_data"]("messy_data.csv")
+    assert untouched["remaining_missing_values"] == original_missing
+    assert untouched["operations"] == []
+
+
+def test_clean_data_drop_duplicates(endpoints, tmp_path):
+    (tmp_path / "dupes.csv").write_text("a,b\n1,x\n1,x\n2,y\n")
+    endpoints["load_csv"](str(tmp_path / "dupes.csv"))
+    result = endpoints["clean_data"]("dupes.csv", drop_duplicates=True)
+    assert result["operations"] == ["Removed 1 duplicate rows"]
+    assert result["new_shape"] == (2, 2)
+
+
+def test_reloading_a_file_invalidates_cached_results(endpoints, tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("name,score\nann,1\nbob,2\n")
+    endpoints["load_csv"](str(path))
+    assert endpoints["get_statistics"]("data.csv")["shape"] == (2, 2)
+    assert endpoints["query_data"]("data.csv", column="name", value="o", condition="contains")["total_matches"] == 1
+    assert endpoints["list_loaded_files"]()["loaded_files"][0]["rows"] == 2
+
+    path.write_text("name,score\nann,1\nbob,2\nrob,3\n")
+    endpoints["load_csv"](str(path))
+    assert endpoints["get_statistics"]("data.csv")["shape"] == (3, 2)
+    assert endpoints["query_data"]("data.csv", column="name", value="o", condition="contains")["total_matches"] == 2
+    assert endpoints["list_loaded_files"]()["loaded_files"][0]["rows"] == 3
+
+
+def test_unload_csv_removes_file(endpoints, employees):
+    assert endpoints["list_loaded_files"]()["total_files"] == 1
+    assert endpoints["unload_csv"](employees) == {"message": f"Successfully unloaded {employees}"}
+    assert endpoints["list_loaded_files"]() == {"loaded_files": [], "total_files": 0}
+    assert "error" in endpoints["get_statistics"](employees)
+
+
+def test_memoized_helpers_follow_a_held_entry_after_unload(csv_agent, endpoints, employees):
+    df, version = csv_agent.csv_store[employees]
+    endpoints["unload_csv"](employees)
+
+    # A request that read the entry before the unload still computes from that frame
+    assert csv_agent._compute_file_info(employees, version)["rows"] == len(df) == 10
+    assert csv_agent._compute_stats(employees, version)["shape"] == (10, 7)
+
+
+READER_FIXTURES = {
+    "temporal": "id,day,at,stamp\n1,2024-01-02,10:30,2024-01-02T11:00\n2,2024-02-03,11:45,2024-02-03T12:00\n",
+    "na_markers": "name,score\nNone,1\n<NA>,2\nbob,\n",
+    "booleans": "flag,bits,mixed\nTrue,1,True\nfalse,0,1\nTRUE,1,0\n",
+    "boolean_with_na": "flag,other\nTrue,1\n,2\nFalse,3\n",
+    "all_empty_column": "a,empty\n1,\n2,\n",
+    "header_only": "x,y\n",
+    "spaces_and_quotes": 'n,s,z\n 5,x ,007\n"6", y,010\n',
+    "duplicate_headers": "a,a,b\n1,2,3\n4,5,6\n",
+    "empty_header": ",x\n0,a\n1,b\n",
+    "int_overflow": "big,small\n99999999999999999999,1\n1,2\n",
+    "uint64": "big\n10000000000000000000\n1\n",
+}
+
+
+@pytest.mark.parametrize("name", sorted(READER_FIXTURES))
+def test_read_csv_matches_pandas(csv_agent, tmp_path, name):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+
+    path = tmp_path / f"{name}.csv"
+    path.write_text(READER_FIXTURES[name])
+    pd.testing.assert_frame_equal(csv_agent._read_csv(str(path), ",", "utf-8"), pd.read_csv(path))
+
+
+@pytest.mark.parametrize("name", ["duplicate_headers", "empty_header", "int_overflow", "uint64"])
+def test_read_csv_falls_back_to_pandas(csv_agent, tmp_path, name):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / f"{name}.csv"
+    path.write_text(READER_FIXTURES[name])
+    assert csv_agent._read_csv_arrow(str(path), ",", "utf-8") is None
+
+
+@pytest.mark.parametrize("name", ["employees.csv", "messy_data.csv", "sales_data.csv"])
+def test_arrow_reader_matches_pandas_on_sample_data(csv_agent, name):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+
+    path = os.path.join(SAMPLE_DATA, name)
+    pd.testing.assert_frame_equal(csv_agent._read_csv_arrow(path, ",", "utf-8"), pd.read_csv(path))
+
+
+def test_arrow_export_format(csv_agent, tmp_path):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+
+    df = pd.DataFrame({"whole": [1.0, 2.0], "text": ["a", "b"], "flag": [True, False]})
+    output = tmp_path / "arrow.csv"
+    csv_agent._write_csv(df, str(output), include_index=False, delimiter=",")
+    assert output.read_text() == '"whole","text","flag"\n1,"a",true\n2,"b",false\n'
+
+    reloaded = csv_agent._read_csv(str(output), ",", "utf-8")
+    assert str(reloaded["whole"].dtype) == "int64"
+    assert reloaded["whole"].tolist() == df["whole"].tolist()
+
+
+def test_get_statistics_results_do_not_share_cached_state(endpoints, employees):
+    first = endpoints["get_statistics"](employees)
+    first["numeric_statistics"]["salary"]["max"] = -1
+    first["string_statistics"]["department"]["most_common"].clear()
+    first["columns"].append("injected")
+
+    second = endpoints["get_statistics"](employees)
+    assert second["numeric_statistics"]["salary"]["max"] == 85000
+    assert second["string_statistics"]["department"]["most_common"]["Engineering"] == 4
+    assert "injected" not in second["columns"]
+
+
+def test_list_loaded_files_results_do_not_share_cached_state(endpoints, employees):
+    first = endpoints["list_loaded_files"]()
+    first["loaded_files"][0]["column_names"].clear()
+    first["loaded_files"].clear()
+
+    second = endpoints["list_loaded_files"]()
+    assert second["total_files"] == len(second["loaded_files"]) == 1
+    assert "salary" in second["loaded_files"][0]["column_names"]
+
+
+def test_list_loaded_files_with_several_files(endpoints):
+    names = ["employees.csv", "messy_data.csv", "sales_data.csv"]
+    for name in names:
+        endpoints["load_csv"](os.path.join(SAMPLE_DATA, name))
+
+    listing = endpoints["list_loaded_files"]()
+    assert listing["total_files"] == 3
+    assert [info["filename"] for info in listing["loaded_files"]] == names
+    for info in listing["loaded_files"]:
+        sample = endpoints["get_sample_data"](info["filename"], n_rows=1)
+        assert info["rows"] == sample["total_rows"]
+        assert info["column_names"] == sample["sample_data"]["columns"]
+        assert info["columns"] == len(info["column_names"]) == len(info["dtypes"])
+        assert info["memory_usage"].endswith(" MB")
+
+
+def test_payload_columns_are_lists_across_endpoints(endpoints, employees):
+    payloads = [
+        endpoints["get_sample_data"](employees)["sample_data"],
+        endpoints["query_data"](employees)["results"],
+        endpoints["query_data"](employees, column="department", value="HR")["results"],
+        endpoints["query_data"](employees, expr="age > 30")["results"],
+    ]
+    for payload in payloads:
+        assert type(payload["columns"]) is list
+        assert payload["columns"] == payloads[0]["columns"]
@@ -1,8 +1,14 @@
-"""Integration tests using real Lihil app instance and Starlette TestClient."""
+"""Integration tests using real Lihil app instance and an in-process httpx client."""
 
-import json
+# Only tests that actually go over HTTP may request ``test_client``: it runs the
+# app lifespan. MCP-only tests use ``lihil_mcp`` directly, and no fixture here is autouse.
+
+from typing import Final
+
+import httpx
+import msgspec
 import pytest
-from starlette.testclient import TestClient
+from asgi_lifespan import LifespanManager
 
 from lihil import Lihil
 from lihil.routing import Route
@@ -11,88 +17,113 @@ from lihil_mcp.config import MCPConfig
 from lihil_mcp.decorators import mcp_tool, mcp_resource
 
 
-def create_real_lihil_app() -> Lihil:
-    """Create a real Lihil application with endpoints that have MCP decorators."""
-    
-    # Create different routes for different endpoints
-    api_route = Route("/api")
-    
-    @api_route.get
-    def get_users():
-        """Get all users from the system."""
-        return {"users": [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}]}
-    
-    @api_route.post
-    @mcp_tool(description="Create a new user")
-    def create_user(name: str, email: str = "default@example.com"):
-        """Create a new user with name and optional email."""
-        return {"id": 3, "name": name, "email": email, "created": True}
-    
-    # Health endpoint
-    health_route = Route("/health")
-    
-    @health_route.get
-    @mcp_resource(uri_template="lihil://health", description="System health status")
-    def health_check():
-        """Check system health status."""
-        return {"status": "healthy", "timestamp": "2023-01-01T00:00:00Z"}
-    
-    # User management endpoint
-    user_mgmt_route = Route("/users")
-    
-    @user_mgmt_route.put
-    @mcp_tool(description="Update user by ID")
-    def update_user(user_id: int, name: str = None, email: str = None):
-        """Update user information by ID."""
-        updates = {}
-        if name:
-            updates["name"] = name
-        if email:
-            updates["email"] = email
-        return {"id": user_id, "updated": updates, "success": True}
-    
-    @user_mgmt_route.delete
-    def delete_user(user_id: int):
-        """Delete user by ID."""
-        return {"id": user_id, "deleted": True}
-    
-    # Admin endpoints
-    admin_route = Route("/admin")
-    
-    @admin_route.get
-    def get_stats():
-        """Get system statistics."""
-        return {"total_users": 10, "active_sessions": 5}
-    
-    @admin_route.post
-    def create_backup(backup_type: str = "full"):
-        """Create system backup."""
-        return {"backup_id": "backup_123", "type": backup_type, "status": "started"}
-    
-    # Create the Lihil app with all routes
-    app = Lihil(api_route, health_route, user_mgmt_route, admin_route)
-    return app
+# Endpoints with MCP decorators, defined once at module scope
+api_route = Route("/api")
+
+
+@api_route.get
+def get_users():
+    """Get all users from the system."""
+    return {"users": [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}]}
+
+
+@api_route.post
+@mcp_tool(description="Create a new user")
+def create_user(name: str, email: str = "default@example.com"):
+    """Create a new user with name and optional email."""
+    return {"id": 3, "name": name, "email": email, "created": True}
+
+
+# Health endpoint
+health_route = Route("/health")
+
+
+@health_route.get
+@mcp_resource(uri_template="lihil://health", description="System health status")
+def health_check():
+    """Check system health status."""
+    return {"status": "healthy", "timestamp": "2023-01-01T00:00:00Z"}
+
+
+# User management endpoint
+user_mgmt_route = Route("/users")
+
+
+@user_mgmt_route.put
+@mcp_tool(description="Update user by ID")
+def update_user(user_id: int, name: str = None, email: str = None):
+    """Update user information by ID."""
+    updates = {}
+    if name:
+        updates["name"] = name
+    if email:
+        updates["email"] = email
+    return {"id": user_id, "updated": updates, "success": True}
+
+
+@user_mgmt_route.delete
+def delete_user(user_id: int):
+    """Delete user by ID."""
+    return {"id": user_id, "deleted": True}
+
+
+# Admin endpoints
+admin_route = Route("/admin")
+
+
+@admin_route.get
+def get_stats():
+    """Get system statistics."""
+    return {"total_users": 10, "active_sessions": 5}
 
 
-@pytest.fixture
+@admin_route.post
+def create_backup(backup_type: str = "full"):
+    """Create system backup."""
+    return {"backup_id": "backup_123", "type": backup_type, "status": "started"}
+
+
+# Expected payloads, built once rather than per test run
+_USERS_EXPECTED: Final = {"users": [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}]}
+_CREATE_USER_PARAMS: Final = {"name": "Charlie", "email": "charlie@example.com"}
+_CREATE_USER_EXPECTED: Final = {**_CREATE_USER_PARAMS, "created": True}
+_HEALTH_EXPECTED: Final = {"status": "healthy", "timestamp": "2023-01-01T00:00:00Z"}
+_UPDATE_USER_PARAMS: Final = {"user_id": 1, "name": "Alice Updated", "email": "alice.new@example.com"}
+_UPDATE_USER_EXPECTED: Final = {
+    "id": 1,
+    "updated": {"name": "Alice Updated", "email": "alice.new@example.com"},
+    "success": True,
+}
+_CREATED_INVARIANT: Final = {"id": 3, "created": True}
+
+# Shared configs; tests must treat them as read-only
+_MCP_CONFIG: Final = MCPConfig(server_name="test-mcp-server", auto_expose=False)
+_MCP_AUTO_EXPOSE_CONFIG: Final = MCPConfig(server_name="test-mcp-server", auto_expose=True)
+
+
+def _build_app() -> Lihil:
+    return Lihil(api_route, health_route, user_mgmt_route, admin_route)
+
+
+@pytest.fixture(scope="session")
 def lihil_app():
     """Create real Lihil application."""
-    return create_real_lihil_app()
+    return _build_app()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mcp_config():
     """Create MCP config for testing."""
-    return MCPConfig(server_name="test-mcp-server", auto_expose=False)
+    return _MCP_CONFIG
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def auto_expose_config():
     """Create MCP config with auto-expose enabled."""
-    return MCPConfig(server_name="test-mcp-server", auto_expose=True)
+    return _MCP_AUTO_EXPOSE_CONFIG
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def lihil_mcp(lihil_app, mcp_config):
     """Create LihilMCP instance with real Lihil app."""
     mcp = LihilMCP(lihil_app, mcp_config)
@@ -101,7 +132,7 @@ def lihil_mcp(lihil_app, mcp_config):
     return mcp
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def auto_expose_lihil_mcp(lihil_app, auto_expose_config):
     """Create LihilMCP instance with auto-expose enabled."""
     mcp = LihilMCP(lihil_app, auto_expose_config)
@@ -110,79 +141,77 @@ def auto_expose_lihil_mcp(lihil_app, auto_expose_config):
     return mcp
 
 
-@pytest.fixture
-def test_client(lihil_app):
-    """Create Starlette TestClient for the real Lihil app with proper lifespan handling."""
-    # TestClient automatically handles lifespan events, but we need to ensure it's configured properly
-    with TestClient(lihil_app) as client:
-        yield client
+@pytest.fixture(scope="session")
+async def sample_mcp_create_user_results(lihil_mcp):
+    """Two create_user results via MCP with different inputs, computed once per session."""
+    # Test via MCP - this calls the same underlying function that would be used for HTTP
+    mcp_result1 = await lihil_mcp._call_endpoint("create_user", {
+        "name": "MCP User 1", 
+        "email": "mcp1@example.com"
+    })
+    mcp_result2 = await lihil_mcp._call_endpoint("create_user", {
+        "name": "MCP User 2", 
+        "email": "mcp2@example.com"
+    })
+    return mcp_result1, mcp_result2
+
+
+@pytest.fixture(scope="session")
+async def sample_health_resource(lihil_mcp):
+    """The lihil://health resource read via MCP, computed once per session."""
+    return await lihil_mcp._call_endpoint_as_resource("lihil://health")
+
+
+@pytest.fixture(scope="session")
+async def test_client():
+    """Create an httpx client bound to a real Lihil app, with its lifespan running."""
+    # The lifespan adds Lihil's doc routes, so it runs on an app of its own and
+    # the shared ``lihil_app`` never depends on whether an HTTP test ran first.
+    # Requests run on the test's event loop instead of a TestClient portal thread
+    async with LifespanManager(_build_app()) as manager:
+        transport = httpx.ASGITransport(app=manager.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
 
 
 class TestLihilHTTPIntegration:
-    """Integration tests for Lihil app HTTP endpoints using Starlette TestClient."""
-    
-    def test_get_users_endpoint(self, test_client):
-        """Test GET /api endpoint returns users."""
-        response = test_client.get("/api")
-        assert response.status_code == 200
-        data = response.json()
-        assert "users" in data
-        assert len(data["users"]) == 2
-        assert data["users"][0]["name"] == "Alice"
-    
-    def test_create_user_endpoint(self, test_client):
-        """Test POST /api endpoint creates user."""
-        user_data = {"name": "Charlie", "email": "charlie@example.com"}
-        response = test_client.post("/api", params=user_data)
-        assert response.status_code == 200
-        data = response.json()
-        assert data["name"] == "Charlie"
-        assert data["email"] == "charlie@example.com"
-        assert data["created"] is True
-    
-    def test_health_check_endpoint(self, test_client):
-        """Test GET /health endpoint."""
-        response = test_client.get("/health")
-        assert response.status_code == 200
-        data = response.json()
-        assert data["status"] == "healthy"
-        assert "timestamp" in data
-    
-    def test_update_user_endpoint(self, test_client):
-        """Test PUT /users endpoint."""
-        update_data = {"user_id": 1, "name": "Alice Updated", "email": "alice.new@example.com"}
-        response = test_client.put("/users", params=update_data)
-        assert response.status_code == 200
-        data = response.json()
-        assert data["id"] == 1
-        assert data["updated"]["name"] == "Alice Updated"
-        assert data["success"] is True
-    
-    def test_delete_user_endpoint(self, test_client):
-        """Test DELETE /users endpoint."""
-        response = test_client.request("DELETE", "/users", params={"user_id": 1})
-        assert response.status_code == 200
-        data = response.json()
-        assert data["id"] == 1
-        assert data["deleted"] is True
-    
-    def test_admin_stats_endpoint(self, test_client):
-        """Test GET /admin endpoint."""
-        response = test_client.get("/admin")
-        assert response.status_code == 200
-        data = response.json()
-        assert data["total_users"] == 10
-        assert data["active_sessions"] == 5
+    """Integration tests for Lihil app HTTP endpoints using an httpx AsyncClient."""
     
-    def test_admin_backup_endpoint(self, test_client):
-        """Test POST /admin endpoint."""
-        backup_data = {"backup_type": "incremental"}
-        response = test_client.post("/admin", params=backup_data)
+    @pytest.mark.parametrize(
+        "method,path,params,expected",
+        [
+            pytest.param("GET", "/api", None, _USERS_EXPECTED, id="get_users"),
+            pytest.param(
+                "POST", "/api", _CREATE_USER_PARAMS, _CREATE_USER_EXPECTED, id="create_user"
+            ),
+            pytest.param("GET", "/health", None, _HEALTH_EXPECTED, id="health_check"),
+            pytest.param(
+                "PUT", "/users", _UPDATE_USER_PARAMS, _UPDATE_USER_EXPECTED, id="update_user"
+            ),
+            pytest.param(
+                "DELETE", "/users", {"user_id": 1},
+                {"id": 1, "deleted": True},
+                id="delete_user",
+            ),
+            pytest.param(
+                "GET", "/admin", None,
+                {"total_users": 10, "active_sessions": 5},
+                id="admin_stats",
+            ),
+            pytest.param(
+                "POST", "/admin", {"backup_type": "incremental"},
+                {"backup_id": "backup_123", "type": "incremental", "status": "started"},
+                id="admin_backup",
+            ),
+        ],
+    )
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_endpoint(self, test_client, method, path, params, expected):
+        """Test each HTTP endpoint returns what its Lihil function produces."""
+        response = await test_client.request(method, path, params=params)
         assert response.status_code == 200
-        data = response.json()
-        assert data["backup_id"] == "backup_123"
-        assert data["type"] == "incremental"
-        assert data["status"] == "started"
+        assert expected.items() <= msgspec.json.decode(response.content).items()
 
 
 class TestLihilMCPIntegration:
@@ -241,11 +270,8 @@ class TestLihilMCPIntegration:
             "email": "john@example.com"
         })
         
-        # Verify the result comes from the actual function
-        assert result["name"] == "John"
-        assert result["email"] == "john@example.com"
-        assert result["created"] is True
-        assert result["id"] == 3  # This specific value comes from our function
+        # Verify the result comes from the actual function (id 3 is specific to it)
+        assert {"id": 3, "name": "John", "email": "john@example.com", "created": True}.items() <= result.items()
     
     @pytest.mark.asyncio
     async def test_mcp_tool_execution_with_defaults(self, lihil_mcp):
@@ -256,9 +282,7 @@ class TestLihilMCPIntegration:
         })
         
         # Should use the default email from the function
-        assert result["name"] == "Jane"
-        assert result["email"] == "default@example.com"
-        assert result["created"] is True
+        assert {"name": "Jane", "email": "default@example.com", "created": True}.items() <= result.items()
     
     @pytest.mark.asyncio
     async def test_mcp_tool_with_typed_parameters(self, lihil_mcp):
@@ -270,19 +294,12 @@ class TestLihilMCPIntegration:
         })
         
         # Verify the function received the correct types
-        assert result["id"] == 42
-        assert result["updated"]["name"] == "Updated Name"
-        assert result["success"] is True
+        assert {"id": 42, "updated": {"name": "Updated Name"}, "success": True}.items() <= result.items()
     
-    @pytest.mark.asyncio
-    async def test_mcp_resource_access_calls_lihil_functions(self, lihil_mcp):
+    def test_mcp_resource_access_calls_lihil_functions(self, sample_health_resource):
         """Test that accessing MCP resources calls the actual Lihil endpoint functions."""
-        # Test health resource - this should call the actual function
-        result = await lihil_mcp._call_endpoint_as_resource("lihil://health")
-        
-        # Verify the result comes from the actual function
-        assert result["status"] == "healthy"
-        assert result["timestamp"] == "2023-01-01T00:00:00Z"  # Specific value from our function
+        # Verify the result comes from the actual function (timestamp is specific to it)
+        assert _HEALTH_EXPECTED.items() <= sample_health_resource.items()
     
     def test_input_schema_generation_from_lihil_functions(self, lihil_mcp):
         """Test that input schemas are correctly generated from actual Lihil function signatures."""
@@ -314,42 +331,32 @@ class TestLihilMCPIntegration:
 class TestEndToEndIntegration:
     """End-to-end integration tests combining HTTP and MCP access to the same Lihil functions."""
     
-    def test_same_function_accessible_via_http_and_mcp(self, test_client, lihil_mcp):
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_same_function_accessible_via_http_and_mcp(self, test_client, lihil_mcp):
         """Test that the same Lihil function can be called via both HTTP and MCP."""
         # Test via HTTP
-        http_response = test_client.post("/api", params={
+        http_response = await test_client.post("/api", params={
             "name": "HTTP User",
             "email": "http@example.com"
         })
         assert http_response.status_code == 200
-        http_data = http_response.json()
+        http_data = msgspec.json.decode(http_response.content)
         
         # Test via MCP - this should call the same underlying function
-        import asyncio
-        mcp_result = asyncio.run(lihil_mcp._call_endpoint("create_user", {
+        mcp_result = await lihil_mcp._call_endpoint("create_user", {
             "name": "MCP User", 
             "email": "mcp@example.com"
-        }))
+        })
         
-        # Both should have same structure (same function), different data
-        assert http_data["created"] == mcp_result["created"]
-        assert http_data["id"] == mcp_result["id"]
-        assert http_data["name"] != mcp_result["name"]  # Different input data
-        assert http_data["email"] != mcp_result["email"]  # Different input data
+        # Both paths reach the same function, which always returns id 3 and created=True;
+        # argument plumbing is covered by the per-path tests
+        assert _CREATED_INVARIANT.items() <= http_data.items()
+        assert _CREATED_INVARIANT.items() <= mcp_result.items()
     
-    def test_mcp_only_functionality(self, lihil_mcp):
+    def test_mcp_only_functionality(self, sample_mcp_create_user_results):
         """Test MCP-specific functionality that works regardless of HTTP issues."""
-        # Test via MCP - this calls the same underlying function that would be used for HTTP
-        import asyncio
-        mcp_result1 = asyncio.run(lihil_mcp._call_endpoint("create_user", {
-            "name": "MCP User 1", 
-            "email": "mcp1@example.com"
-        }))
-        
-        mcp_result2 = asyncio.run(lihil_mcp._call_endpoint("create_user", {
-            "name": "MCP User 2", 
-            "email": "mcp2@example.com"
-        }))
+        mcp_result1, mcp_result2 = sample_mcp_create_user_results
         
         # Both should have same structure (same function), different data
         assert mcp_result1["created"] == mcp_result2["created"]
@@ -363,25 +370,24 @@ class TestEndToEndIntegration:
         from lihil_mcp.types import MCPError
         
         # Test calling non-existent tool
-        with pytest.raises(MCPError, match="Tool nonexistent not found"):
+        with pytest.raises(MCPError) as excinfo:
             await lihil_mcp._call_endpoint("nonexistent", {})
+        assert "Tool nonexistent not found" in str(excinfo.value)
         
         # Test calling tool with missing required arguments
         with pytest.raises(MCPError):
             await lihil_mcp._call_endpoint("create_user", {})  # missing required 'name'
     
-    def test_lihil_app_structure_integration(self, lihil_app, lihil_mcp):
+    def test_lihil_app_structure_integration(self, lihil_app, lihil_mcp, mcp_config):
         """Test that the MCP plugin correctly integrates with Lihil's app structure."""
-        # Verify the MCP plugin found all the routes from the Lihil app
-        assert lihil_mcp.app == lihil_app
-        assert hasattr(lihil_mcp.app, 'routes')
-        assert len(lihil_mcp.app.routes) == 4  # api, health, users, admin routes
+        fresh = LihilMCP(_build_app(), mcp_config)
+        fresh.setup_mcp_tools_and_resources()
         
-        # Verify endpoint mapping was created
-        assert len(lihil_mcp._endpoint_map) > 0
+        # Exactly the api, health, users and admin routes: no lifespan ran on this app
+        assert lihil_mcp.app is lihil_app
+        assert [route.path for route in lihil_app.routes] == ["/api", "/health", "/users", "/admin"]
         
-        # Verify both tools and resources were registered
-        tools = lihil_mcp.tools
-        resources = lihil_mcp.resources
-        assert len(tools) >= 2  # create_user, update_user
-        assert len(resources) >= 1  # health_check
\ No newline at end of file
+        # Same registrations as an MCP server built on a fresh app
+        assert len(lihil_mcp._endpoint_map) == len(fresh._endpoint_map) == 3
+        assert sorted(lihil_mcp.tools) == sorted(fresh.tools) == ["create_user", "update_user"]
+        assert sorted(lihil_mcp.resources) == sorted(fresh.resources) == ["lihil://health"]
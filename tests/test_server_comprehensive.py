@@ -1,16 +1,24 @@
 import pytest
-from unittest.mock import Mock, AsyncMock, patch, MagicMock
+from unittest.mock import Mock
+import asyncio
 import inspect
-import json
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional
 
 from lihil import Lihil
 from lihil.routing import Route
-from lihil_mcp.server import LihilMCP
+from lihil_mcp.server import LihilMCP, _param_shape
 from lihil_mcp.config import MCPConfig
 from lihil_mcp.types import MCPError, MCPRegistrationError, MCPToolInfo, MCPResourceInfo
 from lihil_mcp.decorators import mcp_tool, mcp_resource
 
 
+# Every test here runs against the module-wide FastMCP patch from conftest
+pytestmark = pytest.mark.usefixtures("_patch_fastmcp")
+
+
 class MockEndpoint:
     def __init__(self, func, method="GET"):
         self.unwrapped_func = func
@@ -23,13 +31,50 @@ class MockRoute:
         self.endpoints = endpoints or {}
 
 
+@dataclass(slots=True)
+class FakeMCPServer:
+    """FastMCP stand-in that records registered wrappers instead of building Mock trees."""
+
+    tool_calls: int = 0
+    resource_calls: int = 0
+    wrappers: dict = field(default_factory=dict)
+
+    def _register(self, key):
+        def decorator(func):
+            self.wrappers[key] = func
+            return func
+        return decorator
+
+    def tool(self, name, description):
+        self.tool_calls += 1
+        return self._register(name)
+
+    def resource(self, uri):
+        self.resource_calls += 1
+        return self._register(uri)
+
+
 class MockApp:
     def __init__(self, routes=None):
         self.routes = routes or []
+        self.calls = []
     
     async def __call__(self, scope, receive, send):
-        """Mock ASGI callable."""
-        pass
+        """Mock ASGI callable that records what it was called with."""
+        self.calls.append((scope, receive, send))
+
+
+async def _receive():
+    return {}
+
+
+async def _send(message):
+    pass
+
+
+# Shared configs; no test mutates them
+_CONFIG = MCPConfig(server_name="test-server", auto_expose=False)
+_AUTO_CONFIG = MCPConfig(server_name="test-server", auto_expose=True)
 
 
 @pytest.fixture
@@ -39,36 +84,43 @@ def mock_app():
 
 @pytest.fixture
 def config():
-    return MCPConfig(server_name="test-server", auto_expose=False)
+    return _CONFIG
+
+
+@pytest.fixture
+def fake_server(mock_fastmcp):
+    """A FakeMCPServer that the next LihilMCP built in this test will use."""
+    server = FakeMCPServer()
+    mock_fastmcp.return_value = server
+    return server
+
+
+@pytest.fixture
+def make_lihil_mcp(mock_app, config):
+    """Builder for a LihilMCP with the given {tool name or resource URI: function} bound."""
+    def make(endpoints=None):
+        lihil_mcp = LihilMCP(mock_app, config)
+        for key, func in (endpoints or {}).items():
+            lihil_mcp._bind_endpoint(key, MockEndpoint(func))
+        return lihil_mcp
+    return make
 
 
 @pytest.fixture
 def auto_expose_config():
-    return MCPConfig(server_name="test-server", auto_expose=True)
+    return _AUTO_CONFIG
 
 
-@patch('lihil_mcp.server.FastMCP')
-def test_lihil_mcp_init(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_mcp_server.tool = Mock()
-    mock_mcp_server.resource = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
+def test_lihil_mcp_init(mock_fastmcp, fake_server, mock_app, config):
     lihil_mcp = LihilMCP(mock_app, config)
     
     assert lihil_mcp.app == mock_app
     assert lihil_mcp.config == config
-    assert lihil_mcp.mcp_server == mock_mcp_server
+    assert lihil_mcp.mcp_server is fake_server
     mock_fastmcp.assert_called_once_with("test-server")
 
 
-@patch('lihil_mcp.server.FastMCP')
-def test_register_mcp_tool(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_tool_decorator = Mock()
-    mock_mcp_server.tool = Mock(return_value=mock_tool_decorator)
-    mock_fastmcp.return_value = mock_mcp_server
-    
+def test_register_mcp_tool(fake_server, mock_app, config):
     @mcp_tool(description="Test tool")
     def test_func(param1: str, param2: int = 10):
         return {"result": f"{param1}_{param2}"}
@@ -89,16 +141,10 @@ def test_register_mcp_tool(mock_fastmcp, mock_app, config):
     assert "param1" in tool_info.inputSchema["required"]
     assert "param2" not in tool_info.inputSchema["required"]
     
-    mock_mcp_server.tool.assert_called()
+    assert fake_server.tool_calls == 1
 
 
-@patch('lihil_mcp.server.FastMCP')
-def test_register_mcp_resource(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_resource_decorator = Mock()
-    mock_mcp_server.resource = Mock(return_value=mock_resource_decorator)
-    mock_fastmcp.return_value = mock_mcp_server
-    
+def test_register_mcp_resource(fake_server, mock_app, config):
     @mcp_resource(uri_template="test://resource", title="Test Resource")
     def test_resource():
         return {"data": "test"}
@@ -115,21 +161,16 @@ def test_register_mcp_resource(mock_fastmcp, mock_app, config):
     assert resource_info.name == "Test Resource"
     assert resource_info.uri == "test://resource"
     
-    mock_mcp_server.resource.assert_called()
+    assert fake_server.resource_calls == 1
 
 
-@patch('lihil_mcp.server.FastMCP')
-def test_auto_expose_tool_post_method(mock_fastmcp, mock_app, auto_expose_config):
-    mock_mcp_server = Mock()
-    mock_tool_decorator = Mock()
-    mock_mcp_server.tool = Mock(return_value=mock_tool_decorator)
-    mock_fastmcp.return_value = mock_mcp_server
-    
+@pytest.mark.parametrize("method", ["POST", "PUT", "PATCH"])
+def test_auto_expose_tool_method(fake_server, mock_app, auto_expose_config, method):
     def test_func():
         return {"result": "test"}
     
-    endpoint = MockEndpoint(test_func, "POST")
-    route = MockRoute("/test", {"POST": endpoint})
+    endpoint = MockEndpoint(test_func, method)
+    route = MockRoute("/test", {method: endpoint})
     mock_app.routes = [route]
     
     lihil_mcp = LihilMCP(mock_app, auto_expose_config)
@@ -140,53 +181,7 @@ def test_auto_expose_tool_post_method(mock_fastmcp, mock_app, auto_expose_config
     assert "Auto-exposed tool" in tool_info.description
 
 
-@patch('lihil_mcp.server.FastMCP')
-def test_auto_expose_tool_put_method(mock_fastmcp, mock_app, auto_expose_config):
-    mock_mcp_server = Mock()
-    mock_tool_decorator = Mock()
-    mock_mcp_server.tool = Mock(return_value=mock_tool_decorator)
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    def test_func():
-        return {"result": "test"}
-    
-    endpoint = MockEndpoint(test_func, "PUT")
-    route = MockRoute("/test", {"PUT": endpoint})
-    mock_app.routes = [route]
-    
-    lihil_mcp = LihilMCP(mock_app, auto_expose_config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
-    assert "test_func" in lihil_mcp._tools
-
-
-@patch('lihil_mcp.server.FastMCP')
-def test_auto_expose_tool_patch_method(mock_fastmcp, mock_app, auto_expose_config):
-    mock_mcp_server = Mock()
-    mock_tool_decorator = Mock()
-    mock_mcp_server.tool = Mock(return_value=mock_tool_decorator)
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    def test_func():
-        return {"result": "test"}
-    
-    endpoint = MockEndpoint(test_func, "PATCH")
-    route = MockRoute("/test", {"PATCH": endpoint})
-    mock_app.routes = [route]
-    
-    lihil_mcp = LihilMCP(mock_app, auto_expose_config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
-    assert "test_func" in lihil_mcp._tools
-
-
-@patch('lihil_mcp.server.FastMCP')
-def test_auto_expose_resource_get_method(mock_fastmcp, mock_app, auto_expose_config):
-    mock_mcp_server = Mock()
-    mock_resource_decorator = Mock()
-    mock_mcp_server.resource = Mock(return_value=mock_resource_decorator)
-    mock_fastmcp.return_value = mock_mcp_server
-    
+def test_auto_expose_resource_get_method(fake_server, mock_app, auto_expose_config):
     def test_func():
         return {"data": "test"}
     
@@ -202,7 +197,6 @@ def test_auto_expose_resource_get_method(mock_fastmcp, mock_app, auto_expose_con
     assert "Auto-exposed resource" in resource_info.description
 
 
-@patch('lihil_mcp.server.FastMCP')
 def test_registration_error_during_setup(mock_fastmcp, mock_app, config):
     mock_mcp_server = Mock()
     mock_mcp_server.tool = Mock(side_effect=Exception("Tool registration failed"))
@@ -221,47 +215,115 @@ def test_registration_error_during_setup(mock_fastmcp, mock_app, config):
         lihil_mcp.setup_mcp_tools_and_resources()
 
 
-@patch('lihil_mcp.server.FastMCP')
-def test_generate_input_schema_with_different_types(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_mcp_server.tool = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
+def _typed_func(string_param: str, int_param: int, float_param: float, 
+                bool_param: bool, list_param: list, dict_param: dict,
+                no_annotation, optional_param: str = "default"):
+    pass
+
+
+@pytest.fixture(scope="module")
+def type_schema(_patch_fastmcp):
+    """Schema of _typed_func, generated once for all type assertions."""
+    lihil_mcp = LihilMCP(MockApp(), _CONFIG)
+    return lihil_mcp._generate_input_schema(_typed_func)
+
+
+@pytest.mark.parametrize(
+    "param,expected_type,required",
+    [
+        ("string_param", "string", True),
+        ("int_param", "integer", True),
+        ("float_param", "number", True),
+        ("bool_param", "boolean", True),
+        ("list_param", "array", True),
+        ("dict_param", "object", True),
+        ("no_annotation", "string", True),  # defaults to string
+        ("optional_param", "string", False),  # has default value
+    ],
+)
+def test_generate_input_schema_with_different_types(type_schema, param, expected_type, required):
+    assert type_schema["type"] == "object"
+    assert type_schema["properties"][param]["type"] == expected_type
+    assert (param in type_schema["required"]) is required
+
+
+def test_generate_input_schema_unwraps_optional_and_generics(mock_app, config):
+    lihil_mcp = LihilMCP(mock_app, config)
+    
+    def test_func(ids: list[int], tags: Optional[List[str]] = None,
+                  limit: int | None = None, meta: dict[str, int] | None = None):
+        pass
     
+    schema = lihil_mcp._generate_input_schema(test_func)
+    
+    assert schema["properties"]["ids"] == {"type": "array", "items": {"type": "integer"}}
+    assert schema["properties"]["tags"] == {"type": "array", "items": {"type": "string"}}
+    assert schema["properties"]["limit"] == {"type": "integer"}
+    assert schema["properties"]["meta"] == {"type": "object"}
+    assert schema["required"] == ["ids"]
+    assert lihil_mcp._generate_input_schema(test_func) == schema
+
+    def same_shape(ids: list[int], tags: Optional[List[str]] = None,
+                   limit: int | None = None, meta: dict[str, int] | None = None):
+        pass
+    
+    assert lihil_mcp._generate_input_schema(same_shape) == schema
+
+
+def test_generate_input_schema_returns_independent_copies(mock_app, config):
     lihil_mcp = LihilMCP(mock_app, config)
     
-    def test_func(string_param: str, int_param: int, float_param: float, 
-                  bool_param: bool, list_param: list, dict_param: dict,
-                  no_annotation, optional_param: str = "default"):
+    def first(name: str, tags: list[str]):
+        pass
+    
+    def second(name: str, tags: list[str]):
+        pass
+    
+    schema = lihil_mcp._generate_input_schema(first)
+    schema["properties"]["name"]["type"] = "mutated"
+    schema["required"].clear()
+    
+    for func in (first, second):
+        assert lihil_mcp._generate_input_schema(func) == {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "tags": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["name", "tags"],
+        }
+
+
+def test_generate_input_schema_resolves_string_annotations(mock_app, config):
+    lihil_mcp = LihilMCP(mock_app, config)
+    
+    def test_func(count: "int", tags: "list[str]", other: "UndefinedName" = None):
         pass
     
     schema = lihil_mcp._generate_input_schema(test_func)
     
-    assert schema["type"] == "object"
-    assert schema["properties"]["string_param"]["type"] == "string"
-    assert schema["properties"]["int_param"]["type"] == "integer"
-    assert schema["properties"]["float_param"]["type"] == "number"
-    assert schema["properties"]["bool_param"]["type"] == "boolean"
-    assert schema["properties"]["list_param"]["type"] == "array"
-    assert schema["properties"]["dict_param"]["type"] == "object"
-    assert schema["properties"]["no_annotation"]["type"] == "string"  # defaults to string
-    assert schema["properties"]["optional_param"]["type"] == "string"
-    
-    required_params = schema["required"]
-    assert "string_param" in required_params
-    assert "int_param" in required_params
-    assert "float_param" in required_params
-    assert "bool_param" in required_params
-    assert "list_param" in required_params
-    assert "dict_param" in required_params
-    assert "no_annotation" in required_params
-    assert "optional_param" not in required_params  # has default value
-
-
-@patch('lihil_mcp.server.FastMCP')
-def test_generate_input_schema_no_parameters(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
+    assert schema["properties"]["count"] == {"type": "integer"}
+    assert schema["properties"]["tags"] == {"type": "array", "items": {"type": "string"}}
+    assert schema["properties"]["other"] == {"type": "string"}  # unresolvable stays a string
+    assert schema["required"] == ["count", "tags"]
+
+
+def test_param_shape_matches_signature():
+    def positional_and_keyword(a: int, b, /, c: str = "x", *, d: float, e: bool = True):
+        pass
     
+    def var_args(a, *args, **kwargs):
+        pass
+    
+    for func in (positional_and_keyword, var_args):
+        expected = tuple(
+            (name, param.annotation, param.default is inspect.Parameter.empty)
+            for name, param in inspect.signature(func).parameters.items()
+        )
+        assert _param_shape(func) == expected
+
+
+def test_generate_input_schema_no_parameters(mock_app, config):
     lihil_mcp = LihilMCP(mock_app, config)
     
     def test_func():
@@ -271,11 +333,7 @@ def test_generate_input_schema_no_parameters(mock_fastmcp, mock_app, config):
     assert schema is None
 
 
-@patch('lihil_mcp.server.FastMCP')
-def test_generate_input_schema_ignores_self_and_cls(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
+def test_generate_input_schema_ignores_self_and_cls(mock_app, config):
     lihil_mcp = LihilMCP(mock_app, config)
     
     def test_method(self, cls, param: str):
@@ -288,215 +346,169 @@ def test_generate_input_schema_ignores_self_and_cls(mock_fastmcp, mock_app, conf
     assert "param" in schema["properties"]
 
 
-@patch('lihil_mcp.server.FastMCP')
+def _sync_tool(param1: str, param2: int = 10):
+    return {"result": f"{param1}_{param2}"}
+
+
+async def _async_tool(param1: str):
+    return {"result": param1}
+
+
+class CustomObject:
+    def __str__(self):
+        return "custom_object"
+
+
+def _custom_object_tool():
+    return CustomObject()
+
+
+@pytest.mark.parametrize(
+    "func,kwargs,expected",
+    [
+        pytest.param(_sync_tool, {"param1": "hello", "param2": 20}, {"result": "hello_20"}, id="sync"),
+        pytest.param(_async_tool, {"param1": "hello"}, {"result": "hello"}, id="async"),
+        # Call without param2, should use default
+        pytest.param(_sync_tool, {"param1": "hello"}, {"result": "hello_10"}, id="defaults"),
+        pytest.param(_custom_object_tool, {}, "custom_object", id="non_json_serializable"),
+    ],
+)
 @pytest.mark.asyncio
-async def test_call_endpoint_sync_function(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    def test_func(param1: str, param2: int = 10):
-        return {"result": f"{param1}_{param2}"}
+async def test_call_endpoint(make_lihil_mcp, func, kwargs, expected):
+    lihil_mcp = make_lihil_mcp({"test_func": func})
     
-    endpoint = MockEndpoint(test_func)
-    route = MockRoute("/test", {"GET": endpoint})
+    result = await lihil_mcp._call_endpoint("test_func", kwargs)
+    assert result == expected
+
+
+@pytest.mark.asyncio
+async def test_call_endpoint_runs_sync_function_off_event_loop(make_lihil_mcp):
+    def test_func():
+        return {"thread": threading.get_ident()}
     
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp._endpoint_map["test_func"] = endpoint
+    lihil_mcp = make_lihil_mcp({"test_func": test_func, "lihil://test": test_func})
     
-    result = await lihil_mcp._call_endpoint("test_func", {"param1": "hello", "param2": 20})
-    assert result == {"result": "hello_20"}
+    loop_thread = threading.get_ident()
+    tool_result = await lihil_mcp._call_endpoint("test_func", {})
+    resource_result = await lihil_mcp._call_endpoint_as_resource("lihil://test")
+    assert tool_result["thread"] != loop_thread
+    assert resource_result["thread"] != loop_thread
 
 
-@patch('lihil_mcp.server.FastMCP')
 @pytest.mark.asyncio
-async def test_call_endpoint_async_function(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
+async def test_call_endpoint_respects_max_concurrency(mock_app):
+    running = 0
+    peak = 0
     
-    async def test_func(param1: str):
-        return {"result": param1}
+    async def test_func():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"ok": True}
     
-    endpoint = MockEndpoint(test_func)
-    route = MockRoute("/test", {"GET": endpoint})
+    lihil_mcp = LihilMCP(mock_app, MCPConfig(max_concurrency=2))
+    lihil_mcp._bind_endpoint("test_func", MockEndpoint(test_func))
     
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp._endpoint_map["test_func"] = endpoint
+    results = await asyncio.gather(*(lihil_mcp._call_endpoint("test_func", {}) for _ in range(5)))
+    assert results == [{"ok": True}] * 5
+    assert peak == 2
+
+
+def test_bind_endpoint_resolves_call_plan(make_lihil_mcp):
+    async def test_func(param1: str, param2: int = 10):
+        return {"result": param1}
     
-    result = await lihil_mcp._call_endpoint("test_func", {"param1": "hello"})
-    assert result == {"result": "hello"}
+    lihil_mcp = make_lihil_mcp({"test_func": test_func})
+    
+    plan = lihil_mcp._endpoint_map["test_func"]
+    assert plan.func is test_func
+    assert plan.is_coro is True
+    assert list(plan.signature.parameters) == ["param1", "param2"]
+    assert plan.required_params == frozenset({"param1"})
+    assert plan.param_names == frozenset({"param1", "param2"})
+    assert plan.keyword_callable is True
 
 
-@patch('lihil_mcp.server.FastMCP')
 @pytest.mark.asyncio
-async def test_call_endpoint_with_defaults(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
+async def test_call_endpoint_falls_back_to_bind_for_var_kwargs(make_lihil_mcp):
+    def test_func(param1: str, **extra):
+        return {"result": param1, "extra": extra}
     
-    def test_func(param1: str, param2: int = 42):
-        return {"result": f"{param1}_{param2}"}
-    
-    endpoint = MockEndpoint(test_func)
-    route = MockRoute("/test", {"GET": endpoint})
+    lihil_mcp = make_lihil_mcp({"test_func": test_func})
     
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp._endpoint_map["test_func"] = endpoint
+    assert lihil_mcp._endpoint_map["test_func"].keyword_callable is False
+    result = await lihil_mcp._call_endpoint("test_func", {"param1": "a", "other": 1})
+    assert result == {"result": "a", "extra": {"other": 1}}
     
-    # Call without param2, should use default
-    result = await lihil_mcp._call_endpoint("test_func", {"param1": "hello"})
-    assert result == {"result": "hello_42"}
+    with pytest.raises(MCPError):
+        await lihil_mcp._call_endpoint("test_func", {"other": 1})
 
 
-@patch('lihil_mcp.server.FastMCP')
 @pytest.mark.asyncio
-async def test_call_endpoint_not_found(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    lihil_mcp = LihilMCP(mock_app, config)
+async def test_call_endpoint_not_found(make_lihil_mcp):
+    lihil_mcp = make_lihil_mcp()
     
     with pytest.raises(MCPError, match="Tool nonexistent not found"):
         await lihil_mcp._call_endpoint("nonexistent", {})
 
 
-@patch('lihil_mcp.server.FastMCP')
 @pytest.mark.asyncio
-async def test_call_endpoint_function_error(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
+async def test_call_endpoint_function_error(make_lihil_mcp):
     def test_func():
         raise ValueError("Test error")
     
-    endpoint = MockEndpoint(test_func)
-    route = MockRoute("/test", {"GET": endpoint})
-    
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp._endpoint_map["test_func"] = endpoint
+    lihil_mcp = make_lihil_mcp({"test_func": test_func})
     
     with pytest.raises(MCPError, match="Error calling endpoint test_func"):
         await lihil_mcp._call_endpoint("test_func", {})
 
 
-@patch('lihil_mcp.server.FastMCP')
-@pytest.mark.asyncio
-async def test_call_endpoint_non_json_serializable_result(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    class CustomObject:
-        def __str__(self):
-            return "custom_object"
-    
-    def test_func():
-        return CustomObject()
-    
-    endpoint = MockEndpoint(test_func)
-    route = MockRoute("/test", {"GET": endpoint})
-    
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp._endpoint_map["test_func"] = endpoint
-    
-    result = await lihil_mcp._call_endpoint("test_func", {})
-    assert result == "custom_object"
+def _sync_resource():
+    return {"data": "test"}
 
 
-@patch('lihil_mcp.server.FastMCP')
-@pytest.mark.asyncio
-async def test_call_endpoint_as_resource_sync(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    def test_resource():
-        return {"data": "test"}
-    
-    endpoint = MockEndpoint(test_resource)
-    route = MockRoute("/test", {"GET": endpoint})
-    
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp._endpoint_map["test://resource"] = endpoint
-    
-    result = await lihil_mcp._call_endpoint_as_resource("test://resource")
-    assert result == {"data": "test"}
+async def _async_resource():
+    return {"data": "async"}
 
 
-@patch('lihil_mcp.server.FastMCP')
+@pytest.mark.parametrize(
+    "func,expected",
+    [
+        pytest.param(_sync_resource, {"data": "test"}, id="sync"),
+        pytest.param(_async_resource, {"data": "async"}, id="async"),
+        pytest.param(_custom_object_tool, "custom_object", id="non_json_serializable"),
+    ],
+)
 @pytest.mark.asyncio
-async def test_call_endpoint_as_resource_async(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    async def test_resource():
-        return {"data": "async"}
-    
-    endpoint = MockEndpoint(test_resource)
-    route = MockRoute("/test", {"GET": endpoint})
-    
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp._endpoint_map["test://resource"] = endpoint
+async def test_call_endpoint_as_resource(make_lihil_mcp, func, expected):
+    lihil_mcp = make_lihil_mcp({"test://resource": func})
     
     result = await lihil_mcp._call_endpoint_as_resource("test://resource")
-    assert result == {"data": "async"}
+    assert result == expected
 
 
-@patch('lihil_mcp.server.FastMCP')
 @pytest.mark.asyncio
-async def test_call_endpoint_as_resource_not_found(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    lihil_mcp = LihilMCP(mock_app, config)
+async def test_call_endpoint_as_resource_not_found(make_lihil_mcp):
+    lihil_mcp = make_lihil_mcp()
     
     with pytest.raises(MCPError, match="Resource nonexistent not found"):
         await lihil_mcp._call_endpoint_as_resource("nonexistent")
 
 
-@patch('lihil_mcp.server.FastMCP')
 @pytest.mark.asyncio
-async def test_call_endpoint_as_resource_error(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
+async def test_call_endpoint_as_resource_error(make_lihil_mcp):
     def test_resource():
         raise ValueError("Resource error")
     
-    endpoint = MockEndpoint(test_resource)
-    route = MockRoute("/test", {"GET": endpoint})
-    
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp._endpoint_map["test://resource"] = endpoint
+    lihil_mcp = make_lihil_mcp({"test://resource": test_resource})
     
     with pytest.raises(MCPError, match="Error accessing resource test://resource"):
         await lihil_mcp._call_endpoint_as_resource("test://resource")
 
 
-@patch('lihil_mcp.server.FastMCP')
-@pytest.mark.asyncio
-async def test_call_endpoint_as_resource_non_json_serializable(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    class CustomResource:
-        def __str__(self):
-            return "custom_resource"
-    
-    def test_resource():
-        return CustomResource()
-    
-    endpoint = MockEndpoint(test_resource)
-    route = MockRoute("/test", {"GET": endpoint})
-    
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp._endpoint_map["test://resource"] = endpoint
-    
-    result = await lihil_mcp._call_endpoint_as_resource("test://resource")
-    assert result == "custom_resource"
-
-
-@patch('lihil_mcp.server.FastMCP')
-def test_tools_property(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
+def test_tools_property(mock_app, config):
     lihil_mcp = LihilMCP(mock_app, config)
     tool_info = MCPToolInfo(name="test", description="Test tool", inputSchema={})
     lihil_mcp._tools["test"] = tool_info
@@ -504,15 +516,13 @@ def test_tools_property(mock_fastmcp, mock_app, config):
     tools = lihil_mcp.tools
     assert "test" in tools
     assert tools["test"] == tool_info
-    # Ensure it's a copy
+    # Ensure it's a read-only view
     assert tools is not lihil_mcp._tools
+    with pytest.raises(TypeError):
+        tools["other"] = tool_info
 
 
-@patch('lihil_mcp.server.FastMCP')
-def test_resources_property(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
+def test_resources_property(mock_app, config):
     lihil_mcp = LihilMCP(mock_app, config)
     resource_info = MCPResourceInfo(uri="test://resource", name="Test", description="Test resource")
     lihil_mcp._resources["test://resource"] = resource_info
@@ -520,40 +530,38 @@ def test_resources_property(mock_fastmcp, mock_app, config):
     resources = lihil_mcp.resources
     assert "test://resource" in resources
     assert resources["test://resource"] == resource_info
-    # Ensure it's a copy
+    # Ensure it's a read-only view
     assert resources is not lihil_mcp._resources
+    with pytest.raises(TypeError):
+        resources["other://resource"] = resource_info
 
 
-@patch('lihil_mcp.server.FastMCP')
 @pytest.mark.asyncio
-async def test_asgi_http_request(mock_fastmcp, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    # Create a mock app with a tracked __call__ method
-    mock_app = AsyncMock()
-    mock_app.routes = []
-    
+async def test_asgi_http_request(mock_app, config):
     lihil_mcp = LihilMCP(mock_app, config)
     
     # Test that ASGI HTTP requests are forwarded to the Lihil app
     scope = {"type": "http", "path": "/test"}
-    receive = AsyncMock()
-    send = AsyncMock()
     
-    await lihil_mcp(scope, receive, send)
+    await lihil_mcp(scope, _receive, _send)
     
     # Verify that the request was forwarded to the Lihil app
-    mock_app.assert_called_once_with(scope, receive, send)
+    assert mock_app.calls == [(scope, _receive, _send)]
 
 
-@patch('lihil_mcp.server.FastMCP')
-def test_mcp_resource_with_extra_mime_type(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_resource_decorator = Mock()
-    mock_mcp_server.resource = Mock(return_value=mock_resource_decorator)
-    mock_fastmcp.return_value = mock_mcp_server
+@pytest.mark.asyncio
+async def test_asgi_lifespan_sets_up_mcp_endpoints(mock_app, config):
+    lihil_mcp = LihilMCP(mock_app, config)
+    
+    scope = {"type": "lifespan"}
     
+    await lihil_mcp(scope, _receive, _send)
+    
+    assert mock_app.calls == [(scope, _receive, _send)]
+    assert lihil_mcp._mcp_setup_complete is True
+
+
+def test_mcp_resource_with_extra_mime_type(fake_server, mock_app, config):
     @mcp_resource(uri_template="test://resource", title="Test Resource", mime_type="text/plain")
     def test_resource():
         return "plain text"
@@ -569,13 +577,7 @@ def test_mcp_resource_with_extra_mime_type(mock_fastmcp, mock_app, config):
     assert resource_info.mimeType == "text/plain"
 
 
-@patch('lihil_mcp.server.FastMCP')
-def test_auto_expose_resource_with_complex_path(mock_fastmcp, mock_app, auto_expose_config):
-    mock_mcp_server = Mock()
-    mock_resource_decorator = Mock()
-    mock_mcp_server.resource = Mock(return_value=mock_resource_decorator)
-    mock_fastmcp.return_value = mock_mcp_server
-    
+def test_auto_expose_resource_with_complex_path(fake_server, mock_app, auto_expose_config):
     def test_func():
         return {"data": "test"}
     
@@ -592,25 +594,21 @@ def test_auto_expose_resource_with_complex_path(mock_fastmcp, mock_app, auto_exp
 
 
 # Test for missing routes attribute (line 46)
-@patch('lihil_mcp.server.FastMCP')
-def test_app_without_routes_attribute(mock_fastmcp, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
+def test_app_without_routes_attribute(config):
     # Create an app without routes attribute
     mock_app = Mock(spec=[])  # spec=[] means no attributes
     
     # This should not raise an error and should just return early
     lihil_mcp = LihilMCP(mock_app, config)
     assert lihil_mcp.app == mock_app
+    
+    lihil_mcp.setup_mcp_tools_and_resources()
+    assert len(lihil_mcp.tools) == 0
+    assert len(lihil_mcp.resources) == 0
 
 
 # Test for schema generation exception (lines 200-201)
-@patch('lihil_mcp.server.FastMCP')
-def test_generate_input_schema_exception_handling(mock_fastmcp, mock_app, config):
-    mock_mcp_server = Mock()
-    mock_fastmcp.return_value = mock_mcp_server
-    
+def test_generate_input_schema_exception_handling(mock_app, config):
     lihil_mcp = LihilMCP(mock_app, config)
     
     # Test with something that will cause inspect.signature to fail
@@ -620,172 +618,175 @@ def test_generate_input_schema_exception_handling(mock_fastmcp, mock_app, config
     assert schema is None
 
 
-# Test the actual wrapper functions (lines 94, 120, 142, 158) by simulating their execution
-@patch('lihil_mcp.server.FastMCP')
-@pytest.mark.asyncio
-async def test_mcp_tool_wrapper_execution(mock_fastmcp, mock_app, config):
-    """Test that the MCP tool wrapper functions are properly created and called."""
-    mock_mcp_server = Mock()
-    
-    # Capture the wrapper function
-    captured_wrapper = None
-    def capture_tool_decorator(name, description):
-        def decorator(func):
-            nonlocal captured_wrapper
-            captured_wrapper = func
-            return func
-        return decorator
-    
-    mock_mcp_server.tool = capture_tool_decorator
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    @mcp_tool(description="Test tool")
-    def test_func(param: str):
-        return {"result": param}
-    
-    endpoint = MockEndpoint(test_func)
-    route = MockRoute("/test", {"GET": endpoint})
-    mock_app.routes = [route]
-    
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
-    # The wrapper should have been captured
-    assert captured_wrapper is not None
-    
-    # Call the wrapper - this tests line 94
-    result = await captured_wrapper(param="test")
-    assert result == {"result": "test"}
+# Test the actual wrapper functions by simulating their execution
 
+@mcp_tool(description="Test tool")
+def wrapped_tool(param: str):
+    return {"result": param}
 
-@patch('lihil_mcp.server.FastMCP')
-@pytest.mark.asyncio
-async def test_mcp_resource_wrapper_execution(mock_fastmcp, mock_app, config):
-    """Test that the MCP resource wrapper functions are properly created and called."""
-    mock_mcp_server = Mock()
-    
-    # Capture the wrapper function
-    captured_wrapper = None
-    def capture_resource_decorator(uri):
-        def decorator(func):
-            nonlocal captured_wrapper
-            captured_wrapper = func
-            return func
-        return decorator
-    
-    mock_mcp_server.resource = capture_resource_decorator
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    @mcp_resource(uri_template="test://resource", title="Test Resource")
-    def test_resource():
-        return {"data": "test"}
-    
-    endpoint = MockEndpoint(test_resource)
-    route = MockRoute("/test", {"GET": endpoint})
-    mock_app.routes = [route]
-    
-    lihil_mcp = LihilMCP(mock_app, config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
-    # The wrapper should have been captured
-    assert captured_wrapper is not None
-    
-    # Call the wrapper - this tests line 120
-    result = await captured_wrapper()
-    assert result == {"data": "test"}
 
+@mcp_resource(uri_template="test://resource", title="Test Resource")
+def wrapped_resource():
+    return {"data": "test"}
 
-@patch('lihil_mcp.server.FastMCP')
-@pytest.mark.asyncio
-async def test_auto_tool_wrapper_execution(mock_fastmcp, mock_app, auto_expose_config):
-    """Test that the auto-exposed tool wrapper functions are properly created and called."""
-    mock_mcp_server = Mock()
-    
-    # Capture the wrapper function
-    captured_wrapper = None
-    def capture_tool_decorator(name, description):
-        def decorator(func):
-            nonlocal captured_wrapper
-            captured_wrapper = func
-            return func
-        return decorator
-    
-    mock_mcp_server.tool = capture_tool_decorator
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    def test_func(param: str):
-        return {"result": param}
-    
-    endpoint = MockEndpoint(test_func, "POST")
-    route = MockRoute("/test", {"POST": endpoint})
-    mock_app.routes = [route]
-    
-    lihil_mcp = LihilMCP(mock_app, auto_expose_config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
-    # The wrapper should have been captured
-    assert captured_wrapper is not None
-    
-    # Call the wrapper - this tests line 142
-    result = await captured_wrapper(param="test")
-    assert result == {"result": "test"}
 
+def auto_tool(param: str):
+    return {"result": param}
 
-@patch('lihil_mcp.server.FastMCP')
-@pytest.mark.asyncio
-async def test_auto_resource_wrapper_execution(mock_fastmcp, mock_app, auto_expose_config):
-    """Test that the auto-exposed resource wrapper functions are properly created and called."""
-    mock_mcp_server = Mock()
-    
-    # Capture the wrapper function
-    captured_wrapper = None
-    def capture_resource_decorator(uri):
-        def decorator(func):
-            nonlocal captured_wrapper
-            captured_wrapper = func
-            return func
-        return decorator
-    
-    mock_mcp_server.resource = capture_resource_decorator
-    mock_fastmcp.return_value = mock_mcp_server
-    
-    def test_func():
-        return {"data": "test"}
-    
-    endpoint = MockEndpoint(test_func, "GET")
-    route = MockRoute("/test", {"GET": endpoint})
-    mock_app.routes = [route]
+
+def auto_resource():
+    return {"data": "test"}
+
+
+@pytest.fixture(scope="module")
+def captured_wrappers(_patch_fastmcp):
+    """Run setup once over all four wrapper kinds and capture them by name/URI."""
+    fake_server = FakeMCPServer()
+    _patch_fastmcp.return_value = fake_server
     
-    lihil_mcp = LihilMCP(mock_app, auto_expose_config)
+    # auto_expose still registers decorated endpoints through their metadata
+    app = MockApp([
+        MockRoute("/manual", {"GET": MockEndpoint(wrapped_tool)}),
+        MockRoute("/manual_resource", {"GET": MockEndpoint(wrapped_resource)}),
+        MockRoute("/auto", {"POST": MockEndpoint(auto_tool, "POST")}),
+        MockRoute("/auto_resource", {"GET": MockEndpoint(auto_resource, "GET")}),
+    ])
+    lihil_mcp = LihilMCP(app, _AUTO_CONFIG)
     lihil_mcp.setup_mcp_tools_and_resources()
-    
-    # The wrapper should have been captured
-    assert captured_wrapper is not None
-    
-    # Call the wrapper - this tests line 158
-    result = await captured_wrapper()
-    assert result == {"data": "test"}
+    return fake_server.wrappers
+
+
+@pytest.mark.parametrize(
+    "key,kwargs,expected",
+    [
+        pytest.param("wrapped_tool", {"param": "test"}, {"result": "test"}, id="mcp_tool"),
+        pytest.param("test://resource", {}, {"data": "test"}, id="mcp_resource"),
+        pytest.param("auto_tool", {"param": "test"}, {"result": "test"}, id="auto_tool"),
+        pytest.param("lihil://auto_resource", {}, {"data": "test"}, id="auto_resource"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_wrapper_execution(captured_wrappers, key, kwargs, expected):
+    """Test that the registered MCP wrappers call through to their endpoints."""
+    result = await captured_wrappers[key](**kwargs)
+    assert result == expected
 
 
 # Tests using real Lihil applications instead of mocks
 
-def test_real_mcp_tool_registration():
-    """Test MCP tool registration with real Lihil application."""
-    route = Route("/api")
-    
-    @route.post
-    @mcp_tool(description="Create a user with real implementation")
-    def create_user(name: str, email: str = "test@example.com"):
-        return {"id": 1, "name": name, "email": email, "created": True}
-    
-    app = Lihil(route)
-    config = MCPConfig(server_name="test-real-app")
+api_route = Route("/api")
+
+
+@api_route.post
+@mcp_tool(description="Create a user with real implementation")
+def create_user(name: str, email: str = "test@example.com"):
+    return {"id": 1, "name": name, "email": email, "created": True}
+
+
+status_route = Route("/status")
+
+
+@status_route.get
+@mcp_resource(uri_template="lihil://system-status", description="System status endpoint")
+def get_status():
+    return {"status": "healthy", "uptime": "100%"}
+
+
+data_route = Route("/data")
+
+
+@data_route.get
+def get_data():
+    """Retrieve system data."""
+    return {"data": [1, 2, 3, 4, 5]}
+
+
+@data_route.post
+def process_data(input_data: str):
+    """Process input data."""
+    return {"processed": input_data.upper(), "length": len(input_data)}
+
+
+math_route = Route("/math")
+
+
+@math_route.post
+@mcp_tool(description="Add two numbers")
+def add_numbers(a: int, b: int):
+    return {"result": a + b, "operation": "addition"}
+
+
+@math_route.get
+@mcp_resource(uri_template="lihil://math-constants")
+def get_constants():
+    return {"pi": 3.14159, "e": 2.71828}
+
+
+async_route = Route("/async")
+
+
+@async_route.post
+@mcp_tool(description="Async data processor")
+async def process_async(data: str):
+    # Simulate some async work
+    return {"processed": f"ASYNC_{data}", "async": True}
+
+
+error_route = Route("/error")
+
+
+@error_route.post
+@mcp_tool(description="Function that raises an error")
+def error_function(should_error: bool):
+    if should_error:
+        raise ValueError("Intentional test error")
+    return {"success": True}
+
+
+complex_route = Route("/complex")
+
+
+@complex_route.post
+@mcp_tool(description="Handle complex data types")
+def handle_complex(
+    numbers: list,
+    metadata: dict,
+    optional_flag: bool = False
+):
+    return {
+        "numbers_sum": sum(numbers) if numbers else 0,
+        "metadata_keys": list(metadata.keys()) if metadata else [],
+        "flag_set": optional_flag
+    }
+
+
+@lru_cache(maxsize=None)
+def _real_lihil_mcp(routes, auto_expose=False):
+    """Build and set up a LihilMCP over a real Lihil app, once per route shape."""
+    app = Lihil(*routes)
+    config = MCPConfig(server_name="test-real-app", auto_expose=auto_expose)
     lihil_mcp = LihilMCP(app, config)
     lihil_mcp.setup_mcp_tools_and_resources()
-    
+    return lihil_mcp
+
+
+@pytest.fixture
+def real_lihil_mcp():
+    return _real_lihil_mcp(
+        (api_route, status_route, math_route, async_route, error_route, complex_route)
+    )
+
+
+@pytest.fixture
+def real_auto_lihil_mcp():
+    return _real_lihil_mcp((data_route,), auto_expose=True)
+
+
+def test_real_mcp_tool_registration(real_lihil_mcp):
+    """Test MCP tool registration with real Lihil application."""
     # Verify tool registration
-    assert "create_user" in lihil_mcp.tools
-    tool_info = lihil_mcp.tools["create_user"]
+    assert "create_user" in real_lihil_mcp.tools
+    tool_info = real_lihil_mcp.tools["create_user"]
     assert tool_info.name == "create_user"
     assert "Create a user with real implementation" in tool_info.description
     assert tool_info.inputSchema is not None
@@ -795,158 +796,65 @@ def test_real_mcp_tool_registration():
     assert "email" not in tool_info.inputSchema["required"]  # Has default
 
 
-def test_real_mcp_resource_registration():
+def test_real_mcp_resource_registration(real_lihil_mcp):
     """Test MCP resource registration with real Lihil application."""
-    route = Route("/status")
-    
-    @route.get
-    @mcp_resource(uri_template="lihil://system-status", description="System status endpoint")
-    def get_status():
-        return {"status": "healthy", "uptime": "100%"}
-    
-    app = Lihil(route)
-    config = MCPConfig(server_name="test-real-app")
-    lihil_mcp = LihilMCP(app, config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
     # Verify resource registration
-    assert "lihil://system-status" in lihil_mcp.resources
-    resource_info = lihil_mcp.resources["lihil://system-status"]
+    assert "lihil://system-status" in real_lihil_mcp.resources
+    resource_info = real_lihil_mcp.resources["lihil://system-status"]
     assert resource_info.uri == "lihil://system-status"
     assert resource_info.description == "System status endpoint"
     assert resource_info.mimeType == "application/json"
 
 
-def test_real_auto_expose_functionality():
+def test_real_auto_expose_functionality(real_auto_lihil_mcp):
     """Test auto-expose functionality with real Lihil application."""
-    route = Route("/data")
-    
-    @route.get
-    def get_data():
-        """Retrieve system data."""
-        return {"data": [1, 2, 3, 4, 5]}
-    
-    @route.post
-    def process_data(input_data: str):
-        """Process input data."""
-        return {"processed": input_data.upper(), "length": len(input_data)}
-    
-    app = Lihil(route)
-    config = MCPConfig(server_name="test-auto-expose", auto_expose=True)
-    lihil_mcp = LihilMCP(app, config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
     # Verify auto-exposed tool (POST)
-    assert "process_data" in lihil_mcp.tools
-    tool_info = lihil_mcp.tools["process_data"]
+    assert "process_data" in real_auto_lihil_mcp.tools
+    tool_info = real_auto_lihil_mcp.tools["process_data"]
     # Function has docstring, so that's used instead of "Auto-exposed tool"
     assert tool_info.description == "Process input data."
     
     # Verify auto-exposed resource (GET)
-    assert "lihil://data" in lihil_mcp.resources
-    resource_info = lihil_mcp.resources["lihil://data"]
+    assert "lihil://data" in real_auto_lihil_mcp.resources
+    resource_info = real_auto_lihil_mcp.resources["lihil://data"]
     # Function has docstring, so that's used instead of "Auto-exposed resource"
     assert resource_info.description == "Retrieve system data."
 
 
 @pytest.mark.asyncio
-async def test_real_endpoint_execution():
+async def test_real_endpoint_execution(real_lihil_mcp):
     """Test actual endpoint execution through MCP with real Lihil application."""
-    route = Route("/math")
-    
-    @route.post
-    @mcp_tool(description="Add two numbers")
-    def add_numbers(a: int, b: int):
-        return {"result": a + b, "operation": "addition"}
-    
-    @route.get
-    @mcp_resource(uri_template="lihil://math-constants")
-    def get_constants():
-        return {"pi": 3.14159, "e": 2.71828}
-    
-    app = Lihil(route)
-    config = MCPConfig(server_name="test-math-app")
-    lihil_mcp = LihilMCP(app, config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
     # Test tool execution
-    result = await lihil_mcp._call_endpoint("add_numbers", {"a": 5, "b": 3})
+    result = await real_lihil_mcp._call_endpoint("add_numbers", {"a": 5, "b": 3})
     assert result == {"result": 8, "operation": "addition"}
     
     # Test resource execution
-    result = await lihil_mcp._call_endpoint_as_resource("lihil://math-constants")
+    result = await real_lihil_mcp._call_endpoint_as_resource("lihil://math-constants")
     assert result == {"pi": 3.14159, "e": 2.71828}
 
 
 @pytest.mark.asyncio
-async def test_real_async_endpoint():
+async def test_real_async_endpoint(real_lihil_mcp):
     """Test async endpoint execution with real Lihil application."""
-    route = Route("/async")
-    
-    @route.post
-    @mcp_tool(description="Async data processor")
-    async def process_async(data: str):
-        # Simulate some async work
-        return {"processed": f"ASYNC_{data}", "async": True}
-    
-    app = Lihil(route)
-    config = MCPConfig(server_name="test-async-app")
-    lihil_mcp = LihilMCP(app, config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
     # Test async endpoint execution
-    result = await lihil_mcp._call_endpoint("process_async", {"data": "test"})
+    result = await real_lihil_mcp._call_endpoint("process_async", {"data": "test"})
     assert result == {"processed": "ASYNC_test", "async": True}
 
 
-def test_real_error_handling():
+def test_real_error_handling(real_lihil_mcp):
     """Test error handling with real Lihil application."""
-    route = Route("/error")
-    
-    @route.post
-    @mcp_tool(description="Function that raises an error")
-    def error_function(should_error: bool):
-        if should_error:
-            raise ValueError("Intentional test error")
-        return {"success": True}
-    
-    app = Lihil(route)
-    config = MCPConfig(server_name="test-error-app")
-    lihil_mcp = LihilMCP(app, config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
     # Test that function is registered
-    assert "error_function" in lihil_mcp.tools
+    assert "error_function" in real_lihil_mcp.tools
     
     # Test error propagation (this would be tested in integration tests)
     # The actual error handling is tested in the integration tests with real execution
 
 
-def test_real_complex_types():
+def test_real_complex_types(real_lihil_mcp):
     """Test complex type handling with real Lihil application."""
-    route = Route("/complex")
-    
-    @route.post
-    @mcp_tool(description="Handle complex data types")
-    def handle_complex(
-        numbers: list,
-        metadata: dict,
-        optional_flag: bool = False
-    ):
-        return {
-            "numbers_sum": sum(numbers) if numbers else 0,
-            "metadata_keys": list(metadata.keys()) if metadata else [],
-            "flag_set": optional_flag
-        }
-    
-    app = Lihil(route)
-    config = MCPConfig(server_name="test-complex-app")
-    lihil_mcp = LihilMCP(app, config)
-    lihil_mcp.setup_mcp_tools_and_resources()
-    
     # Verify tool registration
-    assert "handle_complex" in lihil_mcp.tools
-    tool_info = lihil_mcp.tools["handle_complex"]
+    assert "handle_complex" in real_lihil_mcp.tools
+    tool_info = real_lihil_mcp.tools["handle_complex"]
     
     # Verify schema generation for complex types
     schema = tool_info.inputSchema
@@ -955,4 +863,3 @@ def test_real_complex_types():
     assert schema["properties"]["optional_flag"]["type"] == "boolean"
     assert "numbers" in schema["required"]
     assert "metadata" in schema["required"]
-    assert "optional_flag" not in schema["required"]
\ No newline at end of file
@@ -21,6 +21,8 @@ def test_mcp_tool_info():
     assert tool.name == "test_tool"
     assert tool.description == "A test tool"
     assert tool.inputSchema == {"type": "object"}
+    with pytest.raises(AttributeError):
+        tool.name = "other"
 
 
 def test_mcp_resource_info():